@@ -1,14 +1,56 @@
 import datetime as dt
 from typing import Union
 
+import numpy as np
 import pandas as pd
 
-from .base import TradierApiBase
+from .base import TradierApiBase, _to_df
+
+# Seconds to reuse the user profile response, it isn't affected by trading. Call clear_cache() to force a refresh.
+# Balances, positions and history change as soon as an order fills, so they are only cached when a call asks for it
+# with cache_ttl.
+PROFILE_CACHE_TTL = 300
+
+VALID_ACTIVITY_TYPES = frozenset(
+    {
+        "trade",
+        "option",
+        "ach",
+        "wire",
+        "dividend",
+        "fee",
+        "tax",
+        "journal",
+        "check",
+        "transfer",
+        "adjustment",
+        "interest",
+    }
+)
+
+# History requests for at least this many rows are streamed and parsed incrementally instead of buffered
+HISTORY_STREAM_MIN_LIMIT = 1000
 
 
 class Account(TradierApiBase):
-    def __init__(self, account_number, auth_token, is_paper=True):
-        TradierApiBase.__init__(self, account_number, auth_token, is_paper)
+    __slots__ = (
+        "PROFILE_ENDPOINT",
+        "ACCOUNT_BALANCE_ENDPOINT",
+        "ACCOUNT_GAINLOSS_ENDPOINT",
+        "ACCOUNT_HISTORY_ENDPOINT",
+        "ACCOUNT_POSITIONS_ENDPOINT",
+        "ACCOUNT_INDIVIDUAL_ORDER_ENDPOINT",
+        "QUOTES_ENDPOINT",
+        "PROFILE_URL",
+        "ACCOUNT_BALANCE_URL",
+        "ACCOUNT_GAINLOSS_URL",
+        "ACCOUNT_HISTORY_URL",
+        "ACCOUNT_POSITIONS_URL",
+        "QUOTES_URL",
+    )
+
+    def __init__(self, account_number, auth_token, is_paper=True, session=None):
+        TradierApiBase.__init__(self, account_number, auth_token, is_paper, session)
 
         # Account endpoints
         self.PROFILE_ENDPOINT = "v1/user/profile"  # GET
@@ -17,6 +59,15 @@ class Account(TradierApiBase):
         self.ACCOUNT_HISTORY_ENDPOINT = f"v1/accounts/{account_number}/history"  # GET
         self.ACCOUNT_POSITIONS_ENDPOINT = f"v1/accounts/{account_number}/positions"  # GET
         self.ACCOUNT_INDIVIDUAL_ORDER_ENDPOINT = "v1/accounts/{account_id}/orders/{order_id}"  # GET
+        self.QUOTES_ENDPOINT = "v1/markets/quotes"  # GET - used to enrich positions
+
+        # Full urls are built once here rather than on every request
+        self.PROFILE_URL = f"{self._base_url}/{self.PROFILE_ENDPOINT}"
+        self.ACCOUNT_BALANCE_URL = f"{self._base_url}/{self.ACCOUNT_BALANCE_ENDPOINT}"
+        self.ACCOUNT_GAINLOSS_URL = f"{self._base_url}/{self.ACCOUNT_GAINLOSS_ENDPOINT}"
+        self.ACCOUNT_HISTORY_URL = f"{self._base_url}/{self.ACCOUNT_HISTORY_ENDPOINT}"
+        self.ACCOUNT_POSITIONS_URL = f"{self._base_url}/{self.ACCOUNT_POSITIONS_ENDPOINT}"
+        self.QUOTES_URL = f"{self._base_url}/{self.QUOTES_ENDPOINT}"
 
     def get_user_profile(self):
         """
@@ -47,10 +98,10 @@ class Account(TradierApiBase):
             account.type                   	margin
             account.last_update_date 		2021-06-23T22:04:20.000Z
         """
-        data = self.request(endpoint=self.PROFILE_ENDPOINT)
-        return pd.json_normalize(data["profile"])
+        data = self.request(endpoint=self.PROFILE_URL, cache_ttl=PROFILE_CACHE_TTL)
+        return _to_df(data["profile"], nested=True)
 
-    def get_account_balance(self) -> pd.DataFrame:
+    def get_account_balance(self, cache_ttl: Union[float, None] = None) -> pd.DataFrame:
         """
         Fetch the account balance information from the Tradier Account API.
 
@@ -59,6 +110,10 @@ class Account(TradierApiBase):
         The API response is expected to be in JSON format, containing details about the account
         balance.
 
+        Args:
+            cache_ttl (float | None, optional): Seconds to reuse a previous response for, e.g. for a loop that polls
+                the balance. Defaults to None, which always fetches the current balance.
+
         Returns:
             pandas.DataFrame: A DataFrame containing account balance information.
 
@@ -94,8 +149,8 @@ class Account(TradierApiBase):
             margin.stock_short_value       0
             margin.sweep                   0
         """
-        data = self.request(endpoint=self.ACCOUNT_BALANCE_ENDPOINT)
-        return pd.json_normalize(data["balances"])
+        data = self.request(endpoint=self.ACCOUNT_BALANCE_URL, cache_ttl=cache_ttl)
+        return _to_df(data["balances"], nested=True)
 
     def get_gainloss(self) -> pd.DataFrame:
         """
@@ -117,7 +172,7 @@ class Account(TradierApiBase):
             3  2023-09-13T00:00:00.000Z   20700.0     1620.0    7.83   22320.0    9.0  H AL251219C00018000    20
             4  2023-09-06T00:00:00.000Z   16967.0     -193.0   -1.14   16774.0    100.0                TXN     5
         """
-        data = self.request(endpoint=self.ACCOUNT_GAINLOSS_ENDPOINT)
+        data = self.request(endpoint=self.ACCOUNT_GAINLOSS_URL)
 
         # If gainloss was not returned, return None
         if not data.get("gainloss"):
@@ -127,7 +182,7 @@ class Account(TradierApiBase):
         if not isinstance(data["gainloss"], dict) or not data["gainloss"].get("closed_position"):
             return None
 
-        return pd.json_normalize(data["gainloss"]["closed_position"])
+        return _to_df(data["gainloss"]["closed_position"], nested=True)
 
     def get_history(
         self,
@@ -136,6 +191,7 @@ class Account(TradierApiBase):
         limit: Union[int, None] = None,  # Tradier default if not specified is only 25
         activity_type: Union[str, None] = None,
         symbol: Union[str, None] = None,
+        cache_ttl: Union[float, None] = None,
     ) -> pd.DataFrame:
         """
         Get account activity history
@@ -147,34 +203,22 @@ class Account(TradierApiBase):
             activity_type (str | None, optional): Type of activity to filter by. Valid values are:
                 trade, option, ach, wire, dividend, fee, tax, journal, check, transfer, adjustment, interest
             symbol (str | None, optional): Symbol to filter by. Defaults to None.
+            cache_ttl (float | None, optional): Seconds to reuse a previous response for. Defaults to None (no
+                caching). Streamed histories (limit >= HISTORY_STREAM_MIN_LIMIT) are never cached.
 
         Returns:
             pd.DataFrame: DataFrame of account activity history. See Tradier documentation for details of columns
                 returned.  https://documentation.tradier.com/brokerage-api/accounts/get-account-history
 
         """
-        valid_activity_types = [
-            "trade",
-            "option",
-            "ach",
-            "wire",
-            "dividend",
-            "fee",
-            "tax",
-            "journal",
-            "check",
-            "transfer",
-            "adjustment",
-            "interest",
-        ]
         params = {
             "start": self.date2str(start_date),
             "end": self.date2str(end_date),
         }
 
         if activity_type:
-            if activity_type.lower() not in valid_activity_types:
-                raise ValueError(f"activity_type ({activity_type}) must be one of {valid_activity_types}")
+            if activity_type.lower() not in VALID_ACTIVITY_TYPES:
+                raise ValueError(f"activity_type ({activity_type}) must be one of {sorted(VALID_ACTIVITY_TYPES)}")
             params["type"] = activity_type.lower()
 
         if symbol:
@@ -183,10 +227,15 @@ class Account(TradierApiBase):
         if limit:
             params["limit"] = limit
 
-        data = self.request(endpoint=self.ACCOUNT_HISTORY_ENDPOINT, params=params)
-        return pd.json_normalize(data["history"]["event"])
+        if limit and limit >= HISTORY_STREAM_MIN_LIMIT:
+            # Large histories are flattened event by event as they download rather than parsed in one go
+            events = self._stream_items(self.ACCOUNT_HISTORY_URL, "history.event", params=params)
+            return _to_df(events, nested=True)
 
-    def get_positions(self, symbols=False, equities=False, options=False):
+        data = self.request(endpoint=self.ACCOUNT_HISTORY_URL, params=params, cache_ttl=cache_ttl)
+        return _to_df(data["history"]["event"], nested=True)
+
+    def get_positions(self, symbols=False, equities=False, options=False, cache_ttl: Union[float, None] = None):
         """
         Fetch and filter position data from the Tradier Account API.
 
@@ -204,6 +253,8 @@ class Account(TradierApiBase):
             options (bool, optional): If True, filter the positions to include only options
                                         with symbols exceeding 5 characters in length.
                                         If False, no filtering based on options will be applied.
+            cache_ttl (float | None, optional): Seconds to reuse a previous response for. Defaults to None, which
+                                        always fetches the current positions.
 
         Returns:
             pandas.DataFrame: A DataFrame containing filtered position information based on
@@ -222,25 +273,101 @@ class Account(TradierApiBase):
             # Retrieve only options
             options_positions = get_positions(options=True)
         """
-        data = self.request(endpoint=self.ACCOUNT_POSITIONS_ENDPOINT)
+        data = self.request(endpoint=self.ACCOUNT_POSITIONS_URL, cache_ttl=cache_ttl)
         if data:
             # If there are no positions, return an empty DataFrame
             if not data.get("positions") or data["positions"] == "null":
                 return pd.DataFrame()
 
-            # Convert the position data to a list if it is not already (needed if exactly 1 position)
-            position_data = data["positions"]["position"]
-            if not isinstance(position_data, list):
-                position_data = [position_data]
-
-            # Create the DataFrame
-            positions_df = pd.DataFrame(position_data)
+            # Create the DataFrame (a single position is returned as a dict rather than a list)
+            positions_df = _to_df(data["positions"]["position"])
 
+            # Build a single boolean mask for all the filters and index the DataFrame once
+            mask = np.ones(len(positions_df), dtype=bool)
             if symbols:
-                positions_df = positions_df.query("symbol in @symbols")
-            if equities:
-                positions_df = positions_df[positions_df["symbol"].str.len() < 5]
-                options = False
-            if options:
-                positions_df = positions_df[positions_df["symbol"].str.len() > 5]
+                mask &= positions_df["symbol"].isin(frozenset(symbols)).to_numpy()
+            if equities or options:
+                # Measure every symbol once with numpy instead of going through pandas' per-element .str accessor
+                syms = positions_df["symbol"].to_numpy()
+                lengths = np.fromiter((len(s) for s in syms), dtype=np.int32, count=len(syms))
+                # Equities take precedence if both flags are set
+                mask &= (lengths < 5) if equities else (lengths > 5)
+            return positions_df[mask] if not mask.all() else positions_df
+
+    def get_positions_with_quotes(self, symbols=False, equities=False, options=False) -> pd.DataFrame:
+        """
+        Fetch positions and join them with the current quote for each position's symbol.
+
+        Tradier accepts a comma separated list of symbols for quotes, so the quotes for all positions are fetched
+        in batches of up to 50 symbols rather than with one request per symbol.
+
+        Args:
+            symbols, equities, options: Position filters, see get_positions().
+
+        Returns:
+            pandas.DataFrame: The positions DataFrame with the quote columns (last, bid, ask, ...) appended. Quote
+                columns whose names clash with a position column get a "_quote" suffix.
+
+        Example:
+            # Retrieve equity positions along with their last price
+            positions = get_positions_with_quotes(equities=True)
+            positions[["symbol", "quantity", "cost_basis", "last"]]
+        """
+        positions_df = self.get_positions(symbols, equities, options)
+        if positions_df is None or positions_df.empty:
+            return positions_df
+
+        responses = self._batch_get(self.QUOTES_URL, "symbols", list(positions_df["symbol"].unique()))
+
+        # A single quote is returned as a dict rather than a list
+        quotes = []
+        for response in responses:
+            quotes_data = response.get("quotes")
+            if not isinstance(quotes_data, dict) or "quote" not in quotes_data:
+                continue
+            quote = quotes_data["quote"]
+            quotes.extend(quote if isinstance(quote, list) else [quote])
+
+        if not quotes:
             return positions_df
+
+        quotes_df = _to_df(quotes, nested=True)
+        return positions_df.merge(quotes_df, on="symbol", how="left", suffixes=("", "_quote"))
+
+    async def aget_user_profile(self) -> pd.DataFrame:
+        """
+        Async version of get_user_profile(). Lets several account calls run concurrently, e.g.:
+
+            >>> profile, balance, positions = await asyncio.gather(
+            ...     account.aget_user_profile(), account.aget_account_balance(), account.aget_positions()
+            ... )
+        """
+        return await self._run_async(self.get_user_profile)
+
+    async def aget_account_balance(self, cache_ttl: Union[float, None] = None) -> pd.DataFrame:
+        """
+        Async version of get_account_balance(). See get_account_balance() for a description of the arguments.
+        """
+        return await self._run_async(self.get_account_balance, cache_ttl)
+
+    async def aget_history(
+        self,
+        start_date: Union[dt.datetime, dt.date, str, None] = None,
+        end_date: Union[dt.datetime, dt.date, str, None] = None,
+        limit: Union[int, None] = None,
+        activity_type: Union[str, None] = None,
+        symbol: Union[str, None] = None,
+        cache_ttl: Union[float, None] = None,
+    ) -> pd.DataFrame:
+        """
+        Async version of get_history(). See get_history() for a description of the arguments.
+        """
+        return await self._run_async(self.get_history, start_date, end_date, limit, activity_type, symbol, cache_ttl)
+
+    async def aget_positions(
+        self, symbols=False, equities=False, options=False, cache_ttl: Union[float, None] = None
+    ) -> pd.DataFrame:
+        """
+        Async version of get_positions(). See get_positions() for a description of the arguments.
+        """
+        return await self._run_async(self.get_positions, symbols, equities, options, cache_ttl)
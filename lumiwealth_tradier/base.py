@@ -1,13 +1,39 @@
+import asyncio
 import datetime as dt
 import json
-from typing import Union, List
 import logging
-from time import sleep
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import List, Union
 
+import pandas as pd
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
 
+try:
+    # orjson is a much faster JSON parser and works directly on the raw response bytes
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    # pyarrow builds typed columns in C, see _to_df(dtype_backend="pyarrow")
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+try:
+    # ijson parses json incrementally, so large responses can be processed while they are still downloading
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
 # Define base url for live/paper trading and individual API endpoints
 TRADIER_LIVE_URL = "https://api.tradier.com"
 TRADIER_SANDBOX_URL = "https://sandbox.tradier.com"
@@ -15,7 +41,16 @@ TRADIER_SANDBOX_URL = "https://sandbox.tradier.com"
 DEFAULT_RETRY_ATTEMPTS = 3
 DEFAULT_RETRY_BACKOFF_FACTOR = 3.06
 DEFAULT_RETRY_WAIT_SECONDS = 3
+DEFAULT_MAX_RETRY_WAIT_SECONDS = 30
 DEFAULT_CONNECTION_TIMEOUT = 10
+# (connect, read) timeout in seconds for every request, so a dead or hung endpoint can't stall the caller
+DEFAULT_TIMEOUT = (3.05, DEFAULT_CONNECTION_TIMEOUT)
+DEFAULT_POOL_CONNECTIONS = 32
+# Connections kept alive per host. Processes running many strategies at once can raise it with TRADIER_POOL_MAXSIZE.
+DEFAULT_POOL_MAXSIZE = int(os.getenv("TRADIER_POOL_MAXSIZE", "64"))
+DEFAULT_CACHE_MAX_ENTRIES = 256
+DEFAULT_BATCH_SIZE = 50  # Max items (e.g. symbols) sent in one request by _batch_get
+DEFAULT_MAX_CONCURRENT_REQUESTS = 10  # Max async calls in flight at once per client to respect Tradier rate limits
 DEFAULT_RETRY_HTTP_STATUS_CODES: List[int] = [409, 429, 500, 502, 503, 504, 520, 530]
 # Don't retry these as they are not transient errors:
 # 401 - Unauthorized
@@ -25,6 +60,9 @@ DEFAULT_ALLOWED_METHODS = frozenset(['GET'])
 # Retry all methods
 # DEFAULT_ALLOWED_METHODS = None
 
+# Shared read-only default for empty params/data so request() doesn't allocate a new dict on every call
+_EMPTY_PARAMS = MappingProxyType({})
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,9 +70,142 @@ class TradierApiError(Exception):
     pass
 
 
+def _flatten(d: dict, parent_key: str = "", sep: str = ".") -> dict:
+    """
+    Flatten a nested dictionary into a single level dictionary, joining nested keys with `sep`.
+    This produces the same column names as pd.json_normalize() but is much faster for the shallow payloads
+    returned by the Tradier API. Lists are kept as values, just like pd.json_normalize() does.
+    :param d: Dictionary to flatten
+    :param parent_key: Prefix to prepend to every key
+    :param sep: Separator used to join nested keys
+    :return: Flattened dictionary
+    """
+    flat = {}
+    # Walk the dictionary with an explicit stack of iterators (rather than recursion) to preserve key order
+    stack = [(parent_key, iter(d.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for key, value in items:
+            new_key = f"{prefix}{sep}{key}" if prefix else key
+            if isinstance(value, dict):
+                stack.append((new_key, iter(value.items())))
+                break
+            flat[new_key] = value
+        else:
+            stack.pop()
+    return flat
+
+
+def _to_df(records, nested: bool = False, dtype_backend: Union[str, None] = None) -> pd.DataFrame:
+    """
+    Build a DataFrame from Tradier API records. The API returns a single dict rather than a list when there is
+    only one record, so a lone dict is wrapped before being passed to pd.DataFrame.from_records().
+    :param records: A record dict, or a list (or any iterable) of record dicts
+    :param nested: Flatten nested dicts into "parent.child" columns with _flatten()
+    :param dtype_backend: None for regular numpy backed columns, or "pyarrow" to build the columns with pyarrow
+            and return pd.ArrowDtype columns. Requires pyarrow to be installed.
+    :return: DataFrame with one row per record
+    """
+    if dtype_backend not in (None, "pyarrow"):
+        raise ValueError(f"Invalid dtype_backend {dtype_backend}. Valid values are None, 'pyarrow'")
+    if dtype_backend == "pyarrow" and pa is None:
+        raise ImportError("dtype_backend='pyarrow' requires pyarrow. Install it with: pip install pyarrow")
+
+    if type(records) is dict:
+        records = (records,)
+    if nested:
+        records = [_flatten(r) for r in records]
+    elif type(records) is not list:
+        records = list(records)
+
+    if dtype_backend == "pyarrow":
+        return pa.Table.from_pylist(records).to_pandas(types_mapper=pd.ArrowDtype)
+    return pd.DataFrame.from_records(records)
+
+
+def _check_errors(ret_data: dict):
+    """
+    This function raises a TradierApiError if a Tradier API response contains an error message.
+    :param ret_data: json object returned by the Tradier API
+    """
+    errors = ret_data.get("errors") if ret_data else None
+    error = errors.get("error") if isinstance(errors, dict) else None
+    if error is None:
+        return
+
+    msg = " | ".join(error) if isinstance(error, list) else error
+    raise TradierApiError(f"Error: {msg}")
+
+
+def _retry_adapter(retries, backoff_factor, status_forcelist, allowed_methods) -> HTTPAdapter:
+    """
+    This function builds a pooled HTTPAdapter that retries transient errors.
+    """
+    retry = Retry(
+        total=retries,
+        read=retries,
+        connect=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=status_forcelist,
+        allowed_methods=allowed_methods,
+    )
+    return HTTPAdapter(
+        max_retries=retry,
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        # Don't block when all connections are busy, open an extra (non pooled) connection instead
+        pool_block=False,
+    )
+
+
+# The default retrying adapter is built once at import time and shared by every default session, so creating a
+# client doesn't allocate a new Retry and urllib3 PoolManager. The adapter (and its connection pools) is thread safe.
+_DEFAULT_ADAPTER = _retry_adapter(
+    DEFAULT_RETRY_ATTEMPTS,
+    DEFAULT_RETRY_BACKOFF_FACTOR,
+    DEFAULT_RETRY_HTTP_STATUS_CODES,
+    DEFAULT_ALLOWED_METHODS,
+)
+
+
+def _new_session() -> requests.Session:
+    """
+    This function builds a requests session with the shared default retrying, pooled HTTPAdapter mounted.
+    """
+    session = requests.Session()
+    session.mount('http://', _DEFAULT_ADAPTER)
+    session.mount('https://', _DEFAULT_ADAPTER)
+    return session
+
+
 class TradierApiBase:
-    def __init__(self, account_number, auth_token, is_paper=True):
+    # Fixed attribute layout: smaller instances and faster attribute access than a per-instance __dict__.
+    # Subclasses that don't declare __slots__ themselves still get a __dict__ as usual.
+    __slots__ = (
+        "is_paper",
+        "_base_url",
+        "ACCOUNT_NUMBER",
+        "AUTH_TOKEN",
+        "REQUESTS_HEADERS",
+        "_session",
+        "_request_headers",
+        "_cache",
+        "_cache_lock",
+        "_async_slots",
+    )
+
+    def __init__(self, account_number, auth_token, is_paper=True, session: Union[requests.Session, None] = None):
+        """
+        :param account_number: Tradier account number
+        :param auth_token: Tradier API access token
+        :param is_paper: Use the sandbox (paper trading) API. Default is True.
+        :param session: Optional requests session to send the requests with, e.g. one shared by several clients
+                so they share its keep-alive connection pool. By default the client creates its own session. The
+                client never stores its access token on a session passed in, so clients with different tokens can
+                share one.
+        """
         self.is_paper = is_paper
+        self._base_url = TRADIER_SANDBOX_URL if is_paper else TRADIER_LIVE_URL
 
         # Define account credentials
         self.ACCOUNT_NUMBER = account_number
@@ -44,17 +215,154 @@ class TradierApiBase:
             "Accept": "application/json",  # Default all interactions with Tradier API to return json
         }
 
-        # Create a session object for retrying requests
-        self._session = requests.Session()
+        # A session object is reused for every request so keep-alive connections to Tradier are pooled instead of
+        # paying for a new TCP+TLS handshake on each call. The retrying adapter is mounted once when the session is
+        # created; re-mounting it per request would throw away the pooled connections.
+        if session is None:
+            self._session = _new_session()
+            # The default headers live on the client's own session so they don't have to be merged into every request
+            self._session.headers.update(self.REQUESTS_HEADERS)
+            self._request_headers = None
+        else:
+            # A session passed in may be shared with clients that use other tokens, so the headers are sent with
+            # each request instead of being written into the session
+            self._session = session
+            self._request_headers = self.REQUESTS_HEADERS
+
+        # LRU cache of GET responses for endpoints that opt in with request(cache_ttl=...)
+        # Maps (method, endpoint, params) -> (monotonic timestamp, response)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # Limits the number of async calls (see _run_async) that can hit the API at the same time
+        self._async_slots = threading.BoundedSemaphore(DEFAULT_MAX_CONCURRENT_REQUESTS)
+
+    async def _run_async(self, func, *args, **kwargs):
+        """
+        This function runs a blocking API call in a worker thread so that several calls can be awaited
+        concurrently, e.g. with asyncio.gather(). The session's connection pool is thread safe, so concurrent
+        calls share keep-alive connections. At most DEFAULT_MAX_CONCURRENT_REQUESTS calls run at once.
+        :param func: Blocking function to call, e.g. self.get_positions
+        :param args: Positional arguments for func
+        :param kwargs: Keyword arguments for func
+        :return: Return value of func
+        """
+        def limited_call():
+            with self._async_slots:
+                return func(*args, **kwargs)
+
+        return await asyncio.to_thread(limited_call)
+
+    def _batch_get(
+            self,
+            endpoint,
+            key,
+            items,
+            max_per_call=DEFAULT_BATCH_SIZE,
+            params=None,
+            required_response_key=None,
+    ) -> list[dict]:
+        """
+        This function GETs an endpoint that accepts a comma separated list of items (e.g. quotes for many symbols).
+        The items are split into chunks of at most max_per_call and the chunks are requested concurrently, so N
+        items cost ceil(N / max_per_call) requests instead of N, in roughly the time of one.
+        :param endpoint: Tradier API endpoint
+        :param key: Name of the parameter that takes the comma separated items, e.g. 'symbols'
+        :param items: List of items to request
+        :param max_per_call: Maximum number of items per request
+        :param params: Dictionary of additional parameters to pass with every request
+        :param required_response_key: Key that must be in each response else that request is retried
+        :return: List of json objects, one per chunk, in the same order as the items
+        """
+        params = params or {}
+        chunks = [items[i:i + max_per_call] for i in range(0, len(items), max_per_call)]
+
+        def fetch(chunk):
+            chunk_params = {**params, key: ",".join(chunk)}
+            return self.request(endpoint, params=chunk_params, required_response_key=required_response_key)
+
+        if len(chunks) <= 1:
+            return [fetch(chunk) for chunk in chunks]
+
+        with ThreadPoolExecutor(max_workers=min(len(chunks), DEFAULT_MAX_CONCURRENT_REQUESTS)) as executor:
+            return list(executor.map(fetch, chunks))
+
+    def _stream_items(self, endpoint, prefix, params=None):
+        """
+        This function makes a GET request and yields the json objects found at `prefix` one at a time, e.g. with
+        prefix 'history.event' it yields each event of {"history": {"event": [...]}}. A single object (which
+        Tradier returns instead of a one element list) is yielded as well.
+
+        If ijson is installed the response is streamed and parsed incrementally, so parsing overlaps the download
+        and the full payload is never held in memory. Otherwise this falls back to a regular request().
+        :param endpoint: Tradier API endpoint, either relative to base_url() or a full url
+        :param prefix: Dot separated path to the object or list of objects to yield
+        :param params: Dictionary of requests.get() parameters to pass to the endpoint
+        :return: Generator of json objects
+        """
+        if ijson is None:
+            data = self.request(endpoint, params=params)
+            for key in prefix.split("."):
+                data = data.get(key) if isinstance(data, dict) else None
+            if isinstance(data, dict):
+                yield data
+            elif isinstance(data, list):
+                yield from data
+            return
+
+        url = endpoint if endpoint.startswith("https://") else f"{self._base_url}/{endpoint}"
+        with self._session.get(
+            url=url,
+            params=params,
+            headers=self._request_headers,
+            timeout=DEFAULT_TIMEOUT,
+            stream=True,
+        ) as r:
+            # Status codes, error pages and error payloads are handled the same way as in request()
+            if r.status_code != 200 and r.status_code != 201 and r.status_code != 502:
+                raise TradierApiError(f"Error: {r.status_code} - {r.text}")
+            if r.status_code == 502:
+                return
+
+            # Let urllib3 undo any gzip content encoding before ijson sees the bytes
+            r.raw.decode_content = True
+            item_prefix = f"{prefix}.item"
+            builder = builder_prefix = None
+            errors = None
+            try:
+                for event_prefix, event, value in ijson.parse(r.raw, use_float=True):
+                    if builder is None:
+                        if event == "start_map" and event_prefix in (prefix, item_prefix, "errors"):
+                            builder = ijson.ObjectBuilder()
+                            builder_prefix = event_prefix
+                            builder.event(event, value)
+                        continue
+
+                    builder.event(event, value)
+                    if event == "end_map" and event_prefix == builder_prefix:
+                        if builder_prefix == "errors":
+                            errors = builder.value
+                        else:
+                            yield builder.value
+                        builder = None
+            except ijson.JSONError as e:
+                # An empty or invalid body has no items, just like request() returns {} for it
+                logger.warning(f"Failed to decode JSON response: {e}")
+
+            _check_errors({"errors": errors} if errors else None)
+
+    def clear_cache(self):
+        """
+        This function clears all cached API responses so that the next request goes to the Tradier API.
+        """
+        with self._cache_lock:
+            self._cache.clear()
 
     def base_url(self):
         """
         This function returns the base url for the Tradier API.
         """
-        if self.is_paper:
-            return TRADIER_SANDBOX_URL
-        else:
-            return TRADIER_LIVE_URL
+        return self._base_url
 
     @staticmethod
     def date2str(date: Union[str, dt.datetime, dt.date], include_min=False) -> str:
@@ -64,21 +372,29 @@ class TradierApiBase:
         :param include_min: Include minutes in the string. Default is False.
         :return: String in the format of YYYY-MM-DD or YYYY-MM-DD HH:MM
         """
-        format_str = "%Y-%m-%d" if not include_min else "%Y-%m-%d %H:%M"
-        if isinstance(date, dt.datetime | dt.date):
-            return date.strftime(format_str)
-        return date
+        # dt.datetime is a subclass of dt.date, so this covers both
+        if not isinstance(date, dt.date):
+            return date
 
-    def delete(self, endpoint, params=None, headers=None, data=None) -> dict:
+        # Format the fields directly rather than going through strftime's locale aware format parser
+        date_str = f"{date.year:04d}-{date.month:02d}-{date.day:02d}"
+        if not include_min:
+            return date_str
+        if isinstance(date, dt.datetime):
+            return f"{date_str} {date.hour:02d}:{date.minute:02d}"
+        return f"{date_str} 00:00"
+
+    def delete(self, endpoint, params=None, headers=None, data=None, timeout=None) -> dict:
         """
         This function makes a DELETE request to the Tradier API and returns a json object.
         :param endpoint:  Tradier API endpoint
         :param params:  Dictionary of requests.delete() parameters to pass to the endpoint
         :param headers:  Dictionary of requests.delete() headers to pass to the endpoint
         :param data:  Dictionary of requests.delete() data to pass to the endpoint
+        :param timeout:  Timeout in seconds, or a (connect, read) tuple. Default is DEFAULT_TIMEOUT.
         :return:  json object
         """
-        return self.request(endpoint, params=params, headers=headers, data=data, method="delete")
+        return self.request(endpoint, params=params, headers=headers, data=data, method="delete", timeout=timeout)
 
     def request(
             self,
@@ -87,46 +403,63 @@ class TradierApiBase:
             headers=None,
             data=None,
             required_response_key=None,
-            method="get"
+            method="get",
+            cache_ttl=None,
+            timeout=None,
     ) -> dict:
         """
         This function makes a request to the Tradier API and returns a json object.
-        :param endpoint: Tradier API endpoint
+        :param endpoint: Tradier API endpoint, either relative to base_url() or a full url
         :param params: Dictionary of requests.get() parameters to pass to the endpoint
-        :param headers: Dictionary of requests.get() headers to pass to the endpoint
+        :param headers: Dictionary of additional headers, merged over the default REQUESTS_HEADERS
         :param data: Dictionary of requests.post() data to pass to the endpoint
         :param method: 'get', 'post' or 'delete'
         :param required_response_key: Key that must be in the data response else it retries the request
+        :param cache_ttl: Seconds to reuse a successful GET response for. Default is None (no caching). Cached
+            responses are shared between callers, so they must not be modified.
+        :param timeout: Timeout in seconds, or a (connect, read) tuple. Default is DEFAULT_TIMEOUT.
         :return: json object
         """
-        if not headers:
-            headers = self.REQUESTS_HEADERS
+        params = params or _EMPTY_PARAMS
+        data = data or _EMPTY_PARAMS
+        timeout = timeout or DEFAULT_TIMEOUT
+        if self._request_headers is not None:
+            headers = self._request_headers if headers is None else {**self._request_headers, **headers}
 
-        if not params:
-            params = {}
+        # Subclasses precompute full urls for their endpoints, so only relative endpoints need joining
+        url = endpoint if endpoint.startswith("https://") else f"{self._base_url}/{endpoint}"
 
-        if not data:
-            data = {}
+        cache_key = None
+        if cache_ttl and method == "get":
+            cache_key = (method, endpoint, tuple(sorted(params.items())))
+            with self._cache_lock:
+                cached = self._cache.get(cache_key)
+                if cached is not None and time.monotonic() - cached[0] < cache_ttl:
+                    self._cache.move_to_end(cache_key)
+                    return cached[1]
 
         # We want to retry GET requests if the response is empty or if the request fails.
         # We don't want to retry other methods because they may have side effects (like submitting
         # extra orders).
         # We use simple a for loop to catch cases when the request succeeds but there was no data.
         retry_attempts = DEFAULT_RETRY_ATTEMPTS if method == "get" else 1
+        # Only complete responses are cached, a response still missing required_response_key after the last retry
+        # shouldn't be served again
+        complete = not required_response_key
         for retry_attempt in range(retry_attempts):
             r = None
             if method == "get":
-                # We use a retry session to handle transient errors and retry the request.
-                r = self.requests_retry_session().get(
-                    url=f"{self.base_url()}/{endpoint}",
+                # The session's adapter handles transient errors and retries the request.
+                r = self._session.get(
+                    url=url,
                     params=params,
                     headers=headers,
-                    timeout=DEFAULT_CONNECTION_TIMEOUT,
+                    timeout=timeout,
                 )
             elif method == "post":
-                r = requests.post(url=f"{self.base_url()}/{endpoint}", params=params, headers=headers, data=data)
+                r = self._session.post(url=url, params=params, headers=headers, data=data, timeout=timeout)
             elif method == "delete":
-                r = requests.delete(url=f"{self.base_url()}/{endpoint}", params=params, data=data, headers=headers)
+                r = self._session.delete(url=url, params=params, data=data, headers=headers, timeout=timeout)
             else:
                 raise ValueError(f"Invalid method {method}. Must be one of ['get', 'post', 'delete']")
 
@@ -136,40 +469,57 @@ class TradierApiBase:
                 raise TradierApiError(f"Error: {r.status_code} - {r.text}")
 
             # Parse the response from the Tradier API.  Sometimes no valid json is returned.
-            try:
-                ret_data = r.json()
-            except json.decoder.JSONDecodeError as  e:
-                logger.warning(f"Failed to decode JSON response: {e}")
+            # An empty body or a 502 error page can't contain json, so don't bother attempting (and failing) to parse.
+            # orjson.JSONDecodeError is a subclass of json.JSONDecodeError so one except clause covers both parsers.
+            if not r.content or r.status_code == 502:
                 ret_data = {}
+            else:
+                try:
+                    ret_data = orjson.loads(r.content) if orjson else r.json()
+                except json.decoder.JSONDecodeError as e:
+                    logger.warning(f"Failed to decode JSON response: {e}")
+                    ret_data = {}
 
             if required_response_key:
                 if required_response_key in ret_data and ret_data[required_response_key] is not None:
+                    complete = True
                     break
                 else:
                     if retry_attempt == retry_attempts - 1:
                         logger.error(f"Response from {endpoint} did not contain {required_response_key}.")
                     else:
                         logger.info(f"Response from {endpoint} did not contain {required_response_key}. Retrying...")
-                        sleep(DEFAULT_RETRY_WAIT_SECONDS)
-
-        if ret_data and "errors" in ret_data and "error" in ret_data["errors"]:
-            if isinstance(ret_data["errors"]["error"], list):
-                msg = " | ".join(ret_data["errors"]["error"])
+                        # Exponential backoff with jitter so that many clients retrying at once don't stay in sync
+                        wait = min(
+                            DEFAULT_RETRY_WAIT_SECONDS * DEFAULT_RETRY_BACKOFF_FACTOR ** retry_attempt,
+                            DEFAULT_MAX_RETRY_WAIT_SECONDS,
+                        )
+                        time.sleep(wait * random.uniform(0.5, 1.5))
             else:
-                msg = ret_data["errors"]["error"]
-            raise TradierApiError(f"Error: {msg}")
+                # Nothing to validate, so the first response is the one we want
+                break
+
+        _check_errors(ret_data)
+
+        if cache_key and complete and ret_data:
+            with self._cache_lock:
+                self._cache[cache_key] = (time.monotonic(), ret_data)
+                self._cache.move_to_end(cache_key)
+                if len(self._cache) > DEFAULT_CACHE_MAX_ENTRIES:
+                    self._cache.popitem(last=False)
 
         return ret_data
 
-    def send(self, endpoint, data, headers=None) -> dict:
+    def send(self, endpoint, data, headers=None, timeout=None) -> dict:
         """
         This function sends a post request to the Tradier API and returns a json object.
         :param endpoint: Tradier API endpoint
         :param data: Dictionary of requests.post() data to pass to the endpoint
         :param headers: Dictionary of requests.post() headers to pass to the endpoint
+        :param timeout: Timeout in seconds, or a (connect, read) tuple. Default is DEFAULT_TIMEOUT.
         :return: json object
         """
-        return self.request(endpoint, params={}, headers=headers, data=data, method="post")
+        return self.request(endpoint, headers=headers, data=data, method="post", timeout=timeout)
 
     def requests_retry_session(
             self,
@@ -179,20 +529,28 @@ class TradierApiBase:
             allowed_methods=DEFAULT_ALLOWED_METHODS,
             session=None,
     ):
+        """
+        This function returns a requests session that retries failed requests.
+        With the default arguments this is the client's own session, which was configured once in __init__, so
+        no new adapter is mounted and the keep-alive connection pool is preserved. Any other arguments mount a new
+        retrying adapter on `session`, or on a new session if none is given.
+        """
         if status_forcelist is None:
             status_forcelist = DEFAULT_RETRY_HTTP_STATUS_CODES
-            
-        session = session or self._session
-        retry = Retry(
-            total=retries,
-            read=retries,
-            connect=retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=status_forcelist,
-            allowed_methods=allowed_methods,
-        )
-        adapter = HTTPAdapter(max_retries=retry)
+
+        if (
+            session is None
+            and retries == DEFAULT_RETRY_ATTEMPTS
+            and backoff_factor == DEFAULT_RETRY_BACKOFF_FACTOR
+            and status_forcelist == DEFAULT_RETRY_HTTP_STATUS_CODES
+            and allowed_methods == DEFAULT_ALLOWED_METHODS
+        ):
+            return self._session
+
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.REQUESTS_HEADERS)
+        adapter = _retry_adapter(retries, backoff_factor, status_forcelist, allowed_methods)
         session.mount('http://', adapter)
         session.mount('https://', adapter)
         return session
-    
\ No newline at end of file
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Union
+
+logger = logging.getLogger(__name__)
+
+# Override the cache location with the TRADIER_CACHE_DIR environment variable
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "lumiwealth-tradier"
+
+
+class FileCache:
+    """
+    Small on-disk cache for raw Tradier API payloads that rarely change (market calendars, option expirations,
+    etc.). Each entry is stored as a JSON file at {cache_dir}/{endpoint}/{md5(params)}.json together with the
+    time it was written, so entries can be expired with a TTL.
+
+    The cache is best effort: any problem reading or writing the cache directory is logged and treated as a
+    cache miss, so the caller simply falls back to hitting the API.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path, None] = None):
+        self.cache_dir = Path(cache_dir or os.getenv("TRADIER_CACHE_DIR") or DEFAULT_CACHE_DIR)
+
+    def _path(self, endpoint: str, params: dict) -> Path:
+        """
+        Path of the cache file for an endpoint and its parameters.
+        :param endpoint: API endpoint, e.g. v1/markets/calendar
+        :param params: Parameters sent with the request
+        :return: Path of the cache file
+        """
+        key = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+        # Full urls keep their host (so sandbox and live entries are separate) but not the scheme
+        endpoint = endpoint.split("://", 1)[-1]
+        return self.cache_dir / endpoint.strip("/").replace("/", "_") / f"{key}.json"
+
+    def get(self, endpoint: str, params: dict, ttl: float) -> Union[dict, None]:
+        """
+        Get a cached payload.
+        :param endpoint: API endpoint, e.g. v1/markets/calendar
+        :param params: Parameters sent with the request
+        :param ttl: Maximum age of the entry in seconds
+        :return: Cached payload, or None if there is no entry or it has expired
+        """
+        path = self._path(endpoint, params)
+        try:
+            with open(path, "rb") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable cache file {path}: {e}")
+            return None
+
+        if time.time() - entry.get("timestamp", 0) > ttl:
+            return None
+        return entry.get("data")
+
+    def set(self, endpoint: str, params: dict, data: dict):
+        """
+        Store a payload in the cache.
+        :param endpoint: API endpoint, e.g. v1/markets/calendar
+        :param params: Parameters sent with the request
+        :param data: JSON serializable payload to store
+        """
+        path = self._path(endpoint, params)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so concurrent readers never see a partially written entry. The name is
+            # unique per thread, since the thread pools and async wrappers can store the same entry at the same time.
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"timestamp": time.time(), "data": data}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.debug(f"Unable to write cache file {path}: {e}")
+
+    def clear(self):
+        """
+        Remove all cached entries.
+        """
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.debug(f"Unable to remove cache file {path}: {e}")
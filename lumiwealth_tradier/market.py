@@ -1,13 +1,52 @@
 import datetime as dt
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union
 import logging
 
+import numpy as np
 import pandas as pd
 
-from .base import TradierApiBase, DEFAULT_RETRY_ATTEMPTS
+from .base import TradierApiBase, DEFAULT_MAX_CONCURRENT_REQUESTS, DEFAULT_RETRY_ATTEMPTS, _to_df
+from .cache import FileCache
 
 logger = logging.getLogger(__name__)
 
+# How long (seconds) payloads from low churn endpoints are kept in the on-disk cache
+CALENDAR_CACHE_TTL = 24 * 60 * 60
+EXPIRATIONS_CACHE_TTL = 60 * 60
+STRIKES_CACHE_TTL = 60 * 60
+LOOKUP_CACHE_TTL = 24 * 60 * 60
+# How long (seconds) a last price seen in a quote is reused by get_last_price(), e.g. right after get_quotes()
+LAST_PRICE_CACHE_TTL = 1.0
+# Bars of past days don't change, but are re-fetched daily to pick up split/dividend adjustments
+HISTORICAL_CACHE_TTL = 24 * 60 * 60
+
+VALID_INTERVALS = frozenset({"daily", "weekly", "monthly"})
+VALID_TIMESALES_INTERVALS = frozenset({1, 5, 15})  # minutes
+VALID_SESSION_FILTERS = frozenset({"all", "open"})
+VALID_LOOKUP_TYPES = frozenset({"stock", "option", "etf", "index"})
+
+
+def _parse_dates(values) -> list[dt.date]:
+    """
+    Parse YYYY-MM-DD strings into datetime.date objects. date.fromisoformat() is implemented in C and skips the
+    format inference done by pd.to_datetime(), and repeated values (e.g. expiration dates in an option chain)
+    are only parsed once.
+    :param values: Iterable of YYYY-MM-DD strings
+    :return: List of dates
+    """
+    parsed = {}
+    dates = []
+    for value in values:
+        date = parsed.get(value)
+        if date is None:
+            date = parsed[value] = dt.date.fromisoformat(value)
+        dates.append(date)
+    return dates
+
 
 class MarketData(TradierApiBase):
     """
@@ -17,8 +56,24 @@ class MarketData(TradierApiBase):
     https://documentation.tradier.com/brokerage-api/markets/get-quotes
     """
 
-    def __init__(self, account_number, auth_token, is_paper=True):
-        TradierApiBase.__init__(self, account_number, auth_token, is_paper)
+    def __init__(self, account_number, auth_token, is_paper=True, use_file_cache=None, session=None):
+        TradierApiBase.__init__(self, account_number, auth_token, is_paper, session)
+        # Nothing is written to disk unless asked for: by default the file cache is only used when the
+        # TRADIER_CACHE_DIR environment variable points it at a directory
+        if use_file_cache is None:
+            use_file_cache = bool(os.getenv("TRADIER_CACHE_DIR"))
+        self._file_cache = FileCache() if use_file_cache else None
+        # Parsed get_option_expirations() results for the current day, they change at most once per trading day
+        self._exp_cache = {}
+        self._exp_cache_day = None
+        # Parsed get_calendar() results for the current day, keyed by (month, year)
+        self._calendar_cache = {}
+        self._calendar_cache_day = None
+        # symbol -> (monotonic timestamp, last price) from the most recent quotes, see LAST_PRICE_CACHE_TTL. The dict
+        # is replaced rather than grown, so symbols quoted long ago don't stay in memory.
+        self._last_prices = {}
+        # (weakref to chains DataFrame, {(option_type, strike): symbol}) for the last chains seen by get_option_symbol
+        self._option_symbol_index = None
 
         # Account endpoints
         self.QUOTES_ENDPOINT = "v1/markets/quotes"
@@ -33,6 +88,40 @@ class MarketData(TradierApiBase):
         self.SEARCH_ENDPOINT = "v1/markets/search"  # Companies lookup
         self.LOOKUP_SYMBOL_ENDPOINT = "v1/markets/lookup"
 
+        # Full urls are built once here rather than on every request
+        self.QUOTES_URL = f"{self._base_url}/{self.QUOTES_ENDPOINT}"
+        self.HISTORICAL_QUOTES_URL = f"{self._base_url}/{self.HISTORICAL_QUOTES_ENDPOINT}"
+        self.TIME_AND_SALES_URL = f"{self._base_url}/{self.TIME_AND_SALES_ENDPOINT}"
+        self.OPTION_CHAIN_URL = f"{self._base_url}/{self.OPTION_CHAIN_ENDPOINT}"
+        self.OPTION_STRIKES_URL = f"{self._base_url}/{self.OPTION_STRIKES_ENDPOINT}"
+        self.OPTION_EXPIRATIONS_URL = f"{self._base_url}/{self.OPTION_EXPIRATIONS_ENDPOINT}"
+        self.OPTION_SYMBOL_URL = f"{self._base_url}/{self.OPTION_SYMBOL_ENDPOINT}"
+        self.CLOCK_URL = f"{self._base_url}/{self.CLOCK_ENDPOINT}"
+        self.CALENDAR_URL = f"{self._base_url}/{self.CALENDAR_ENDPOINT}"
+        self.SEARCH_URL = f"{self._base_url}/{self.SEARCH_ENDPOINT}"
+        self.LOOKUP_SYMBOL_URL = f"{self._base_url}/{self.LOOKUP_SYMBOL_ENDPOINT}"
+
+    def _cached_request(self, endpoint: str, params: dict, required_response_key: str, ttl: float) -> dict:
+        """
+        Same as request(), but payloads are kept in the on-disk FileCache for `ttl` seconds. Only use this for
+        endpoints whose data rarely changes.
+        :param endpoint: API endpoint, either relative to base_url() or a full url
+        :param params: Parameters to send with the request
+        :param required_response_key: Key that must be present in the response
+        :param ttl: Time to live in seconds for the cached payload
+        :return: Response payload
+        """
+        if self._file_cache is None:
+            return self.request(endpoint, params, required_response_key=required_response_key)
+
+        response = self._file_cache.get(endpoint, params, ttl)
+        if response is None:
+            response = self.request(endpoint, params, required_response_key=required_response_key)
+            # Don't cache empty results, the data may not be published yet
+            if response.get(required_response_key):
+                self._file_cache.set(endpoint, params, response)
+        return response
+
     # Create functions for each endpoint
     def get_quotes(self, symbols: Union[str, list[str]], greeks=False) -> pd.DataFrame:
         # noinspection PyShadowingNames
@@ -47,8 +136,12 @@ class MarketData(TradierApiBase):
             >>> quotes = tradier.market.get_quotes(['AAPL', 'MSFT'])
             >>> apple_price = quotes.loc['AAPL']['last']
 
+        All the symbols are fetched with a single request, so pass every symbol (e.g. all the option symbols of a
+        chain) at once rather than calling this in a loop.
+
         :param symbols: List of symbols to get quotes for.
-        :param greeks: Include greeks in response. Only Valid for Options.
+        :param greeks: Include greeks in response. Only Valid for Options. Greeks are returned as columns like
+                "greeks.delta".
         :return: DataFrame of quotes.  See Tradier weblink for column definitions.
         """
         # If any of the symbols contain ".", like "BRK.B", replace with "/"
@@ -56,30 +149,76 @@ class MarketData(TradierApiBase):
 
         # Create payload
         symbols = symbols if isinstance(symbols, str) else ",".join(symbols)
-        payload = {"symbols": symbols, greeks: greeks}
+        payload = {"symbols": symbols, "greeks": greeks}
 
-        response = self.request(self.QUOTES_ENDPOINT, payload, required_response_key="quotes")
+        response = self.request(self.QUOTES_URL, payload, required_response_key="quotes")
 
         if "quote" not in response["quotes"]:
             raise ValueError(f"Invalid symbol: {payload['symbols']}")
 
         # Parse response - single Symbol doesn't return a list from the API, multiple symbols do
         quotes = response["quotes"]["quote"]
-        quotes = quotes if isinstance(quotes, list) else [quotes]
-        df = pd.json_normalize(quotes)
+        # Option quotes requested with greeks have a nested "greeks" dict that becomes "greeks.*" columns
+        df = _to_df(quotes, nested=True)
 
         # Clean up names and add back the "." in the symbol
         df["symbol"] = df["symbol"].str.replace("/", ".")
 
+        # Remember the last prices so a get_last_price() call right after this one doesn't need another request
+        if "last" in df.columns:
+            now = time.monotonic()
+            self._last_prices = {
+                # The column holds None or NaN for symbols that haven't traded
+                symbol: (now, None if pd.isna(last) else float(last))
+                for symbol, last in zip(df["symbol"].tolist(), df["last"].tolist())
+            }
+
         return df.set_index("symbol")
 
     def get_last_price(self, symbol: str) -> float:
         """
         Get the last price for a symbol.
         :param symbol: Symbol to get the last price for.
-        :return: Last price for the symbol.
+        :return: Last price for the symbol, or None if it hasn't traded.
         """
-        return self.get_quotes(symbol).loc[symbol]["last"]
+        # Reuse the price if the symbol was quoted within the last LAST_PRICE_CACHE_TTL seconds
+        cached = self._last_prices.get(symbol.upper())
+        if cached is not None and time.monotonic() - cached[0] < LAST_PRICE_CACHE_TTL:
+            return cached[1]
+
+        # Read the single field straight from the json rather than building a DataFrame with get_quotes()
+        payload = {"symbols": symbol.replace(".", "/"), "greeks": False}
+        response = self.request(self.QUOTES_URL, payload, required_response_key="quotes")
+
+        quotes = response["quotes"]
+        if not isinstance(quotes, dict) or "quote" not in quotes:
+            raise ValueError(f"Invalid symbol: {payload['symbols']}")
+
+        quote = quotes["quote"]
+        if type(quote) is list:
+            quote = quote[0]
+        last = quote.get("last")
+        last = float(last) if last is not None else None
+        # Keep the other prices that are still fresh and drop the expired ones
+        now = time.monotonic()
+        last_prices = {s: entry for s, entry in self._last_prices.items() if now - entry[0] < LAST_PRICE_CACHE_TTL}
+        last_prices[quote.get("symbol", payload["symbols"]).replace("/", ".")] = (now, last)
+        self._last_prices = last_prices
+        return last
+
+    def get_last_prices(self, symbols: list[str]) -> pd.Series:
+        """
+        Get the last price for several symbols with a single quotes request. Prefer this over calling
+        get_last_price() in a loop, which costs one round-trip per symbol.
+
+        Example:
+            >>> prices = tradier.market.get_last_prices(['AAPL', 'MSFT'])
+            >>> apple_price = prices['AAPL']
+
+        :param symbols: List of symbols to get the last price for.
+        :return: Series of last prices indexed by symbol.
+        """
+        return self.get_quotes(symbols)["last"]
 
     def get_historical_quotes(
         self,
@@ -88,6 +227,7 @@ class MarketData(TradierApiBase):
         session_filter: str = "open",
         start_date: Union[dt.datetime, dt.date, str, None] = None,
         end_date: Union[dt.datetime, dt.date, str, None] = None,
+        cache_ttl: Union[float, None] = HISTORICAL_CACHE_TTL,
     ) -> pd.DataFrame:
         """
         Get historical quotes for a symbol.  This is for large timescale aggregation of daily or more.
@@ -100,31 +240,42 @@ class MarketData(TradierApiBase):
                 regular trading sessions (open). Valid values are: all, open
         :param start_date: Start date for historical quotes. Format is YYYY-MM-DD.
         :param end_date: End date for historical quotes. Format is YYYY-MM-DD.
+        :param cache_ttl: Seconds to reuse the file cached bars of a range that ended before today for. Only used when
+                the client has a file cache. Pass None to always fetch from the API.
 
         :return: DataFrame of historical quotes. See Tradier weblink for column definitions.
         """
-        valid_intervals = ["daily", "weekly", "monthly"]
-        if interval.lower() not in valid_intervals:
-            raise ValueError(f"Invalid interval {interval}. Valid intervals are {valid_intervals}")
+        interval_lc = interval.lower()
+        if interval_lc not in VALID_INTERVALS:
+            raise ValueError(f"Invalid interval {interval}. Valid intervals are {sorted(VALID_INTERVALS)}")
 
-        valid_session_filters = ["all", "open"]
-        if session_filter.lower() not in valid_session_filters:
+        session_filter_lc = session_filter.lower()
+        if session_filter_lc not in VALID_SESSION_FILTERS:
             raise ValueError(
-                f"Invalid session_filter {session_filter}. Valid session_filters are " f"{valid_session_filters}"
+                f"Invalid session_filter {session_filter}. Valid session_filters are {sorted(VALID_SESSION_FILTERS)}"
             )
 
         # Create payload
         payload = {
             "symbol": symbol,
-            "interval": interval.lower(),
-            "session_filter": session_filter.lower(),
+            "interval": interval_lc,
+            "session_filter": session_filter_lc,
         }
         if start_date:
             payload["start"] = self.date2str(start_date)
         if end_date:
             payload["end"] = self.date2str(end_date)
 
-        response = self.request(self.HISTORICAL_QUOTES_ENDPOINT, payload, required_response_key="history")
+        # Ranges that ended before today (in New York) are settled, so they can be served from the on-disk cache
+        if (
+            cache_ttl
+            and self._file_cache is not None
+            and "end" in payload
+            and payload["end"][:10] < pd.Timestamp.now(tz="US/Eastern").date().isoformat()
+        ):
+            response = self._cached_request(self.HISTORICAL_QUOTES_URL, payload, "history", cache_ttl)
+        else:
+            response = self.request(self.HISTORICAL_QUOTES_URL, payload, required_response_key="history")
 
         if response["history"] is None or "day" not in response["history"]:
             raise LookupError(
@@ -134,9 +285,8 @@ class MarketData(TradierApiBase):
 
         # Parse response
         quotes = response["history"]["day"]
-        quotes = quotes if isinstance(quotes, list) else [quotes]
-        df = pd.json_normalize(quotes)
-        df["date"] = pd.to_datetime(df["date"]).dt.date
+        df = _to_df(quotes)
+        df["date"] = _parse_dates(df["date"])
         return df.set_index("date")
 
     def get_timesales(
@@ -161,27 +311,27 @@ class MarketData(TradierApiBase):
                 regular trading sessions (open). Valid values are: all, open
         :return: DataFrame of time and sales. See Tradier weblink for column definitions.
         """
-        if interval not in [1, 5, 15]:
-            raise ValueError(f"Invalid interval {interval}. Valid intervals are 1, 5, 15")
+        if interval not in VALID_TIMESALES_INTERVALS:
+            raise ValueError(f"Invalid interval {interval}. Valid intervals are {sorted(VALID_TIMESALES_INTERVALS)}")
 
-        valid_session_filters = ["all", "open"]
-        if session_filter.lower() not in valid_session_filters:
+        session_filter_lc = session_filter.lower()
+        if session_filter_lc not in VALID_SESSION_FILTERS:
             raise ValueError(
-                f"Invalid session_filter {session_filter}. Valid session_filters are " f"{valid_session_filters}"
+                f"Invalid session_filter {session_filter}. Valid session_filters are {sorted(VALID_SESSION_FILTERS)}"
             )
 
         # Create payload
         payload = {
             "symbol": symbol,
             "interval": f"{interval}min",
-            "session_filter": session_filter.lower(),
+            "session_filter": session_filter_lc,
         }
         if start_date:
             payload["start"] = self.date2str(start_date, include_min=True)
         if end_date:
             payload["end"] = self.date2str(end_date, include_min=True)
 
-        response = self.request(self.TIME_AND_SALES_ENDPOINT, payload, required_response_key="series")
+        response = self.request(self.TIME_AND_SALES_URL, payload, required_response_key="series")
 
         if response["series"] is None or "data" not in response["series"]:
             raise LookupError(
@@ -190,9 +340,10 @@ class MarketData(TradierApiBase):
             )
 
         quotes = response["series"]["data"]
-        quotes = quotes if isinstance(quotes, list) else [quotes]  # Can happen if start == end
-        df = pd.json_normalize(quotes)
-        df["datetime"] = pd.to_datetime(df["time"]).dt.tz_localize("US/Eastern")
+        df = _to_df(quotes)  # A single dict is returned if start == end
+        # Tradier returns naive Eastern wall-clock times like "2023-12-01T09:30:00". Giving the exact format skips
+        # format inference, and cache=True only parses each distinct timestamp once.
+        df["datetime"] = pd.to_datetime(df["time"], format="%Y-%m-%dT%H:%M:%S", cache=True).dt.tz_localize("US/Eastern")
         return df.set_index("datetime")
 
     def get_option_expirations(
@@ -221,6 +372,15 @@ class MarketData(TradierApiBase):
         :param include_all_roots: Get expirations related to all option roots. Default is False.
         :return: List of option expirations.
         """
+        today = dt.date.today()
+        if today != self._exp_cache_day:
+            self._exp_cache.clear()
+            self._exp_cache_day = today
+        cache_key = (symbol, strikes, contract_size, expiration_type, include_all_roots)
+        if cache_key in self._exp_cache:
+            # Return a copy so callers can't modify the cached DataFrame
+            return self._exp_cache[cache_key].copy()
+
         # Create payload
         payload = {
             "symbol": symbol,
@@ -230,7 +390,7 @@ class MarketData(TradierApiBase):
             "includeAllRoots": include_all_roots,
         }
 
-        response = self.request(self.OPTION_EXPIRATIONS_ENDPOINT, payload, required_response_key="expirations")
+        response = self._cached_request(self.OPTION_EXPIRATIONS_URL, payload, "expirations", EXPIRATIONS_CACHE_TTL)
 
         if not response["expirations"] or "expiration" not in response["expirations"]:
             raise LookupError(f"No Option Expirations found for: Symbol={payload['symbol']}")
@@ -238,14 +398,22 @@ class MarketData(TradierApiBase):
         # Parse response
         expirations = response["expirations"]["expiration"]
         expirations = expirations if isinstance(expirations, list) else [expirations]
-        df = pd.json_normalize(expirations)
 
-        # Clean up names and set index to be the date (not datetime)
-        df = df.rename(columns={"strikes.strike": "strikes"})
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        return df.set_index("date")
+        # Strikes are nested as {"strikes": {"strike": [...]}}; pull the list up into a "strikes" column
+        expirations = [
+            {**e, "strikes": e["strikes"]["strike"]} if isinstance(e.get("strikes"), dict) else e for e in expirations
+        ]
+        df = _to_df(expirations)
+
+        # Set index to be the date (not datetime)
+        df["date"] = _parse_dates(df["date"])
+        df = df.set_index("date")
+        self._exp_cache[cache_key] = df
+        return df.copy()
 
-    def get_option_chains(self, symbol: str, expiration: Union[dt.date, str], greeks=False) -> pd.DataFrame:
+    def get_option_chains(
+        self, symbol: str, expiration: Union[dt.date, str], greeks=False, dtype_backend: Union[str, None] = None
+    ) -> pd.DataFrame:
         """
         Get option chains for a symbol and expiration.
 
@@ -254,6 +422,8 @@ class MarketData(TradierApiBase):
         :param symbol: Underlying Stock Symbol to get option chains for.
         :param expiration: Expiration date to get option chains for.
         :param greeks: Include greeks in response.
+        :param dtype_backend: Set to "pyarrow" to build the DataFrame with pyarrow backed (pd.ArrowDtype) columns,
+                which is faster and uses less memory for large chains. Requires pyarrow to be installed.
         :return: DataFrame of option chains. See Tradier weblink for column definitions. If greeks are requested,
                 column names like "greeks.delta" will be included.
         """
@@ -264,7 +434,7 @@ class MarketData(TradierApiBase):
             "greeks": greeks,
         }
 
-        response = self.request(self.OPTION_CHAIN_ENDPOINT, payload, required_response_key="options")
+        response = self.request(self.OPTION_CHAIN_URL, payload, required_response_key="options")
 
         if not response["options"] or "option" not in response["options"]:
             raise LookupError(
@@ -273,11 +443,44 @@ class MarketData(TradierApiBase):
 
         # Parse response
         chains = response["options"]["option"]
-        chains = chains if isinstance(chains, list) else [chains]
-        df = pd.json_normalize(chains)
-        df["expiration_date"] = pd.to_datetime(df["expiration_date"]).dt.date
+        df = _to_df(chains, nested=True, dtype_backend=dtype_backend)
+        df["expiration_date"] = _parse_dates(df["expiration_date"])
+        # Only "call" and "put", so filtering on option_type compares small integer codes rather than strings
+        df["option_type"] = df["option_type"].astype("category")
         return df
 
+    def get_option_chains_multi(
+        self,
+        symbol: str,
+        expirations: list[Union[dt.date, str]],
+        greeks=False,
+        dtype_backend: Union[str, None] = None,
+    ) -> dict[Union[dt.date, str], pd.DataFrame]:
+        """
+        Get option chains for several expirations of a symbol. The chains are requested concurrently, so this takes
+        roughly as long as a single get_option_chains() call instead of one round-trip per expiration.
+
+        Example:
+            >>> expirations = tradier.market.get_option_expirations('SPY').index[:5]
+            >>> chains = tradier.market.get_option_chains_multi('SPY', expirations)
+
+        :param symbol: Underlying Stock Symbol to get option chains for.
+        :param expirations: Expiration dates to get option chains for.
+        :param greeks: Include greeks in response.
+        :param dtype_backend: See get_option_chains().
+        :return: Dictionary of option chains DataFrames keyed by the expirations passed in.
+        """
+        def fetch(expiration):
+            return self.get_option_chains(symbol, expiration, greeks=greeks, dtype_backend=dtype_backend)
+
+        expirations = list(expirations)
+        if len(expirations) <= 1:
+            return {e: fetch(e) for e in expirations}
+
+        with ThreadPoolExecutor(max_workers=min(len(expirations), DEFAULT_MAX_CONCURRENT_REQUESTS)) as executor:
+            chains = executor.map(fetch, expirations)
+            return dict(zip(expirations, chains))
+
     def get_option_strikes(self, symbol: str, expiration: Union[dt.date, str]) -> list[float]:
         """
         Get option strikes for a symbol and expiration.
@@ -294,7 +497,7 @@ class MarketData(TradierApiBase):
             "expiration": self.date2str(expiration),
         }
 
-        response = self.request(self.OPTION_STRIKES_ENDPOINT, payload, required_response_key="strikes")
+        response = self._cached_request(self.OPTION_STRIKES_URL, payload, "strikes", STRIKES_CACHE_TTL)
 
         if not response["strikes"] or "strike" not in response["strikes"]:
             raise LookupError(
@@ -328,14 +531,35 @@ class MarketData(TradierApiBase):
         """
         if not isinstance(chains, pd.DataFrame) or chains.empty:
             chains = self.get_option_chains(symbol, expiration)
-        symbol = chains.loc[(chains["strike"] == strike) & (chains["option_type"] == option_type.lower())]["symbol"]
-        if len(symbol) == 0:
+
+        try:
+            return self._get_option_symbol_index(chains)[(option_type.lower(), strike)]
+        except KeyError:
             raise LookupError(
                 f"No Option Symbol found for: Symbol={symbol}, Expiration={expiration}, Strike={strike}, "
                 f"Option Type={option_type}"
-            )
+            ) from None
 
-        return symbol.iloc[0]
+    def _get_option_symbol_index(self, chains: pd.DataFrame) -> dict:
+        """
+        Build a {(option_type, strike): symbol} lookup for an option chains DataFrame. The lookup for the most
+        recently used chains is memoized, so repeated get_option_symbol() calls against the same chains (e.g. a
+        strategy walking many strikes) are a dict hit instead of a scan of the whole chain. Chains modified in
+        place after the first lookup are not picked up; pass a new DataFrame instead.
+        :param chains: DataFrame of option chains as returned by get_option_chains()
+        :return: Dictionary mapping (option_type, strike) to the option symbol
+        """
+        if self._option_symbol_index is not None:
+            chains_ref, index = self._option_symbol_index
+            if chains_ref() is chains:
+                return index
+
+        index = {}
+        for key, option_symbol in zip(zip(chains["option_type"], chains["strike"]), chains["symbol"]):
+            # Keep the first match, like the row order of the chains
+            index.setdefault(key, option_symbol)
+        self._option_symbol_index = (weakref.ref(chains), index)
+        return index
 
     def get_clock(self):
         """
@@ -345,7 +569,7 @@ class MarketData(TradierApiBase):
 
         :return: Dictionary of market clock information. See Tradier weblink for key definitions.
         """
-        response = self.request(self.CLOCK_ENDPOINT)
+        response = self.request(self.CLOCK_URL)
         return response["clock"]
 
     def get_calendar(self, month: int, year: int) -> pd.DataFrame:
@@ -358,23 +582,42 @@ class MarketData(TradierApiBase):
         :param year: Year to get calendar for.
         :return: DataFrame of market calendar. See Tradier weblink for column definitions.
         """
+        # Return a copy so callers can't modify the cached DataFrame
+        return self._get_calendar(month, year).copy()
+
+    def _get_calendar(self, month: int, year: int) -> pd.DataFrame:
+        """
+        get_calendar() without the defensive copy, for internal callers that only read the calendar. The parsed
+        calendars are kept in memory for the rest of the day, on top of the on-disk cache of the raw payloads.
+        """
+        today = dt.date.today()
+        if today != self._calendar_cache_day:
+            self._calendar_cache.clear()
+            self._calendar_cache_day = today
+        cache_key = (int(month), int(year))
+        df = self._calendar_cache.get(cache_key)
+        if df is not None:
+            return df
+
         # Create payload
         payload = {
             "month": f"{month:02d}",
             "year": str(year),
         }
 
-        response = self.request(self.CALENDAR_ENDPOINT, payload, required_response_key="calendar")
+        response = self._cached_request(self.CALENDAR_URL, payload, "calendar", CALENDAR_CACHE_TTL)
 
         if not response["calendar"] or "days" not in response["calendar"]:
             raise LookupError(f"No Calendar found for: Month={payload['month']}, Year={payload['year']}")
 
         # Parse response
         calendar = response["calendar"]["days"]["day"]
-        calendar = calendar if isinstance(calendar, list) else [calendar]
-        df = pd.json_normalize(calendar)
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        return df.set_index("date")
+        # Session times are nested, e.g. {"open": {"start": ..., "end": ...}} becomes "open.start" and "open.end"
+        df = _to_df(calendar, nested=True)
+        df["date"] = _parse_dates(df["date"])
+        df = df.set_index("date")
+        self._calendar_cache[cache_key] = df
+        return df
 
     def lookup_symbol(
         self, query: str, exchanges: Union[str, list, None] = None, types: Union[str, list, None] = None
@@ -389,13 +632,12 @@ class MarketData(TradierApiBase):
         :param types: List or Comma separated list of types to lookup. Valid values are: stock, option etf, index
         :return: DataFrame of symbols. See Tradier weblink for column definitions.
         """
-        valid_types = ["stock", "option", "etf", "index"]
         if types:
             if isinstance(types, str):
                 types = types.split(",")
             for t in types:
-                if t.lower() not in valid_types:
-                    raise ValueError(f"Invalid type {t}. Valid types are {valid_types}")
+                if t.lower() not in VALID_LOOKUP_TYPES:
+                    raise ValueError(f"Invalid type {t}. Valid types are {sorted(VALID_LOOKUP_TYPES)}")
 
         # Create payload
         payload = {
@@ -406,7 +648,7 @@ class MarketData(TradierApiBase):
         if types:
             payload["types"] = types if isinstance(types, str) else ",".join(types)
 
-        response = self.request(self.LOOKUP_SYMBOL_ENDPOINT, payload, required_response_key="securities")
+        response = self._cached_request(self.LOOKUP_SYMBOL_URL, payload, "securities", LOOKUP_CACHE_TTL)
 
         if not response["securities"] or "security" not in response["securities"]:
             raise LookupError(
@@ -416,9 +658,7 @@ class MarketData(TradierApiBase):
 
         # Parse response
         securities = response["securities"]["security"]
-        securities = securities if isinstance(securities, list) else [securities]
-        df = pd.json_normalize(securities)
-        return df
+        return _to_df(securities)
 
     def get_previous_trading_day(self, date: Union[dt.datetime, dt.date, str, None] = None) -> dt.date:
         """
@@ -429,11 +669,48 @@ class MarketData(TradierApiBase):
         """
         if not date:
             date = dt.date.today()
+        elif isinstance(date, str):
+            date = dt.date.fromisoformat(date[:10])
+        elif isinstance(date, dt.datetime):
+            date = date.date()
+
+        # Get calendar for the month of the date. If the date is at the start of the month there may be no trading
+        # day before it, in which case the end of the previous month is checked.
+        month = date
+        for _ in range(2):
+            calendar = self._get_calendar(month.month, month.year)
+
+            # Get the previous trading day with a single mask over the raw arrays instead of filtering the DataFrame
+            days = calendar.index.to_numpy()
+            open_before = np.flatnonzero((calendar["status"].to_numpy() == "open") & (days < date))
+            if len(open_before):
+                return days[open_before[-1]]
 
-        # Get calendar for the month of the date
-        calendar = self.get_calendar(date.month, date.year)
+            month = month.replace(day=1) - dt.timedelta(days=1)
 
-        # Get the previous trading day
-        previous_trading_day = calendar[(calendar["status"] == "open") & (calendar.index < date)].index[-1]
+        raise LookupError(f"No trading day found in the month of or the month before {date}")
 
-        return previous_trading_day
+    async def aget_quotes(self, symbols: Union[str, list[str]], greeks=False) -> pd.DataFrame:
+        """
+        Async version of get_quotes(). See get_quotes() for a description of the arguments.
+        """
+        return await self._run_async(self.get_quotes, symbols, greeks=greeks)
+
+    async def aget_option_expirations(self, symbol: str, **kwargs) -> pd.DataFrame:
+        """
+        Async version of get_option_expirations(). See get_option_expirations() for a description of the arguments.
+        """
+        return await self._run_async(self.get_option_expirations, symbol, **kwargs)
+
+    async def aget_option_chains(
+        self, symbol: str, expiration: Union[dt.date, str], greeks=False, dtype_backend: Union[str, None] = None
+    ) -> pd.DataFrame:
+        """
+        Async version of get_option_chains(). See get_option_chains() for a description of the arguments.
+
+        Example:
+            >>> chains = await asyncio.gather(*[tradier.market.aget_option_chains('SPY', e) for e in expirations])
+        """
+        return await self._run_async(
+            self.get_option_chains, symbol, expiration, greeks=greeks, dtype_backend=dtype_backend
+        )
@@ -1,12 +1,62 @@
-import logging
-import re
+import string
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union
 
 import pandas as pd
 
-from .base import TradierApiBase, TradierApiError
+from .base import TradierApiBase, TradierApiError, DEFAULT_MAX_CONCURRENT_REQUESTS, _to_df
+
+VALID_DURATIONS = frozenset({"day", "gtc", "pre", "post"})
+VALID_ORDER_TYPES = frozenset({"market", "limit", "stop", "stop_limit"})
+VALID_EQUITY_SIDES = frozenset({"buy", "sell", "buy_to_cover", "sell_short"})
+VALID_OPTION_SIDES = frozenset({"buy_to_open", "buy_to_close", "sell_to_open", "sell_to_close"})
+# order() and oco_order() accept both equity and option sides
+VALID_SIDES = VALID_EQUITY_SIDES | VALID_OPTION_SIDES
+# Order types that need a limit price and/or a stop price
+_NEEDS_LIMIT = frozenset({"limit", "stop_limit"})
+_NEEDS_STOP = frozenset({"stop", "stop_limit"})
+
+# Returned (as a copy) when there are no orders. It has the usual order columns so that code like
+# df["status"] doesn't raise a KeyError when the account has no orders.
+_EMPTY_ORDERS_DF = pd.DataFrame(
+    columns=[
+        "id",
+        "type",
+        "symbol",
+        "side",
+        "quantity",
+        "status",
+        "duration",
+        "price",
+        "avg_fill_price",
+        "exec_quantity",
+        "last_fill_price",
+        "last_fill_quantity",
+        "remaining_quantity",
+        "stop_price",
+        "create_date",
+        "transaction_date",
+        "class",
+        "tag",
+    ]
+)
+
+# Tags may only contain ASCII letters, numbers and dash (-). Checking the characters against a set is done
+# entirely in C and is cheaper than running a regex for these short strings.
+_TAG_CHARS = frozenset(string.ascii_letters + string.digits + "-")
+
+# Payload keys of each leg of a multileg or OCO order (at most 4 legs), formatted once rather than per order:
+# (option_symbol, side, quantity, price, stop, type, symbol)
+_MAX_LEGS = 4
+_LEG_KEYS = tuple(
+    (f"option_symbol[{i}]", f"side[{i}]", f"quantity[{i}]", f"price[{i}]", f"stop[{i}]", f"type[{i}]", f"symbol[{i}]")
+    for i in range(_MAX_LEGS)
+)
+
 
 class OrderLeg:
+    __slots__ = ("option_symbol", "side", "quantity", "price", "stock_symbol", "stop", "type")
+
     def __init__(self, option_symbol: str = None, side: str = None, quantity: int = None, price: float = None, stock_symbol: str = None, stop: float = None, type: str = None):
         """
         Initializes an OrderLeg object with the given parameters.
@@ -30,15 +80,25 @@ class OrderLeg:
 
 
 class Orders(TradierApiBase):
-    def __init__(self, account_number, auth_token, is_paper=True):
-        TradierApiBase.__init__(self, account_number, auth_token, is_paper)
+    def __init__(self, account_number, auth_token, is_paper=True, session=None):
+        TradierApiBase.__init__(self, account_number, auth_token, is_paper, session)
 
         # Order endpoint
         self.ORDER_ENDPOINT = f"v1/accounts/{self.ACCOUNT_NUMBER}/orders"  # POST
+        # Full url is built once here rather than on every request
+        self.ORDER_URL = f"{self._base_url}/{self.ORDER_ENDPOINT}"
 
-        # Valid values for checking inputs
-        self.valid_durations = ["day", "gtc", "pre", "post"]
-        self.valid_order_types = ["market", "limit", "stop", "stop_limit"]
+        # Valid values for checking inputs. Kept for backwards compatibility, use the module constants instead.
+        self.valid_durations = VALID_DURATIONS
+        self.valid_order_types = VALID_ORDER_TYPES
+
+    def _order_url(self, order_id: Union[int, str]) -> str:
+        """
+        Url of an individual order.
+        :param order_id: Order ID reported by the order() or order_option() functions
+        :return: Full url of the order
+        """
+        return self.ORDER_URL + "/" + str(order_id)
 
     def cancel(self, order_id: int) -> dict:
         """
@@ -51,7 +111,7 @@ class Orders(TradierApiBase):
         """
 
         try:
-            response = self.delete(f"{self.ORDER_ENDPOINT}/{order_id}")
+            response = self.delete(self._order_url(order_id))
         except TradierApiError as e:
             if "400 - order already in finalized state" in str(e):
                 return {"id": order_id, "status": "ok"}
@@ -59,6 +119,39 @@ class Orders(TradierApiBase):
                 raise e
         return response["order"]
 
+    def cancel_many(self, order_ids: list[Union[int, str]]) -> list[dict]:
+        """
+        Cancel several orders. The cancel requests are sent concurrently (at most DEFAULT_MAX_CONCURRENT_REQUESTS
+        at a time), so cancelling N orders takes about as long as cancelling one.
+
+        :param order_ids: Order IDs reported by the order() or order_option() functions
+        :return: List of json objects, one per order, in the same order as order_ids
+        """
+        order_ids = list(order_ids)
+        if len(order_ids) <= 1:
+            return [self.cancel(order_id) for order_id in order_ids]
+
+        with ThreadPoolExecutor(max_workers=min(len(order_ids), DEFAULT_MAX_CONCURRENT_REQUESTS)) as executor:
+            return list(executor.map(self.cancel, order_ids))
+
+    async def cancel_async(self, order_id: int) -> dict:
+        """
+        Async version of cancel(). See cancel() for a description of the arguments.
+        """
+        return await self._run_async(self.cancel, order_id)
+
+    async def modify_async(
+        self,
+        order_id: int,
+        duration: str = "",
+        limit_price: Union[float, None] = None,
+        stop_price: Union[float, None] = None,
+    ) -> dict:
+        """
+        Async version of modify(). See modify() for a description of the arguments.
+        """
+        return await self._run_async(self.modify, order_id, duration, limit_price, stop_price)
+
     def get_order(self, order_id: Union[int, str], include_tag=True) -> pd.DataFrame:
         """
         Get a specific order based upon the order ID returned by Tradier after submission.
@@ -73,12 +166,12 @@ class Orders(TradierApiBase):
             "includeTags": include_tag,
         }
         data = self.request(
-            endpoint=f"{self.ORDER_ENDPOINT}/{order_id}", params=payload
+            endpoint=self._order_url(order_id), params=payload
         )
         if "order" not in data:
-            return pd.DataFrame()
+            return _EMPTY_ORDERS_DF.copy()
 
-        return pd.json_normalize(data["order"])
+        return _to_df(data["order"], nested=True)
 
     def get_orders(self, include_tag=True) -> pd.DataFrame:
         """
@@ -115,13 +208,16 @@ class Orders(TradierApiBase):
         payload = {
             "includeTags": include_tag,
         }
-        data = self.request(endpoint=self.ORDER_ENDPOINT, params=payload)
+        data = self.request(endpoint=self.ORDER_URL, params=payload)
 
-        # If there are no orders, the API returns an empty dict
-        if not data["orders"] or "order" not in data["orders"]:
-            return pd.DataFrame()
+        # If there are no orders, the API returns "null" or an empty dict for "orders"
+        orders = data.get("orders")
+        order_list = orders.get("order") if isinstance(orders, dict) else None
+        if not order_list:
+            return _EMPTY_ORDERS_DF.copy()
 
-        return pd.json_normalize(data["orders"]["order"])
+        # A single order is returned as a dict rather than a list. Multileg orders keep their legs as a list.
+        return _to_df(order_list, nested=True)
 
     def modify(
         self,
@@ -142,8 +238,8 @@ class Orders(TradierApiBase):
         :param stop_price: Stop price. Required for stop and stop_limit orders.
         :return: json object
         """
-        if duration.lower() not in self.valid_durations:
-            raise ValueError(f"Invalid duration. Must be one of {self.valid_durations}")
+        if duration and duration.lower() not in VALID_DURATIONS:
+            raise ValueError(f"Invalid duration. Must be one of {sorted(VALID_DURATIONS)}")
 
         payload = {
             "order_id": order_id,
@@ -155,7 +251,7 @@ class Orders(TradierApiBase):
         if stop_price:
             payload["stop"] = stop_price
 
-        response = self.send(f"{self.ORDER_ENDPOINT}/{order_id}", payload)
+        response = self.send(self._order_url(order_id), payload)
         return response["order"]
 
     def order(
@@ -186,39 +282,28 @@ class Orders(TradierApiBase):
         :param tag: Optional tag for the order. Must be letters, numbers and dash (-) characters
         :return: json object
         """
-        self._check_order_inputs(duration, limit_price, order_type, stop_price, tag)
-
-        # Equite and Options have different valid sides
-        valid_sides = [
-            "buy",
-            "sell",
-            "buy_to_cover",
-            "sell_short",
-            "buy_to_open",
-            "buy_to_close",
-            "sell_to_open",
-            "sell_to_close",
-        ]
-        if side.lower() not in valid_sides:
-            raise ValueError(f"Invalid side. Must be one of {valid_sides}")
-        
-        symbol_clean = symbol.upper()
-        # If the symbol contains a "." (eg. "BRK.B"), we need to remove it
-        if "." in symbol_clean:
-            symbol_clean = symbol_clean.replace(".", "/")
+        order_type, duration = self._check_order_inputs(duration, limit_price, order_type, stop_price, tag)
+
+        # Equity and option sides are both accepted here, Tradier rejects the ones that don't match the order class
+        side = side.lower()
+        if side not in VALID_SIDES:
+            raise ValueError(f"Invalid side. Must be one of {sorted(VALID_SIDES)}")
+
+        # If the symbol contains a "." (eg. "BRK.B"), Tradier expects a "/" instead
+        symbol = symbol.upper().replace(".", "/")
 
         payload = {
             "class": order_class,
-            "symbol": symbol_clean,
+            "symbol": symbol,
             "option_symbol": option_symbol.upper(),
-            "side": side.lower(),
+            "side": side,
             "quantity": int(quantity),
-            "type": order_type.lower(),
-            "duration": duration.lower(),
+            "type": order_type,
+            "duration": duration,
         }
         self._update_order_payload(payload, limit_price, order_type, stop_price, tag)
 
-        response = self.send(self.ORDER_ENDPOINT, payload)
+        response = self.send(self.ORDER_URL, payload)
         return response["order"]
 
     def order_option(
@@ -249,26 +334,26 @@ class Orders(TradierApiBase):
         :param tag: Optional tag for the order. Must be letters, numbers and dash (-) characters
         :return: json object
         """
-        self._check_order_inputs(duration, limit_price, order_type, stop_price, tag)
-        valid_sides = ["buy_to_open", "buy_to_close", "sell_to_open", "sell_to_close"]
-        if side.lower() not in valid_sides:
-            raise ValueError(f"Invalid side. Must be one of {valid_sides}")
+        order_type, duration = self._check_order_inputs(duration, limit_price, order_type, stop_price, tag)
+        side = side.lower()
+        if side not in VALID_OPTION_SIDES:
+            raise ValueError(f"Invalid side. Must be one of {sorted(VALID_OPTION_SIDES)}")
 
         payload = {
             "class": "option",
             "symbol": asset_symbol.upper(),
             "option_symbol": option_symbol.upper(),
-            "side": side.lower(),
+            "side": side,
             "quantity": int(quantity),
-            "type": order_type.lower(),
-            "duration": duration.lower(),
+            "type": order_type,
+            "duration": duration,
         }
         payload = self._update_order_payload(
             payload, limit_price, order_type, stop_price, tag
         )
 
         # Send the request to the Tradier API
-        response = self.send(self.ORDER_ENDPOINT, payload)
+        response = self.send(self.ORDER_URL, payload)
 
         # Return the response
         return response["order"]
@@ -294,8 +379,11 @@ class Orders(TradierApiBase):
         :return: A dictionary representing the API's response.
         """
         # Ensure there are no more than 4 legs
-        if len(legs) > 4:
-            raise ValueError("A multi-leg order can have up to 4 legs.")
+        if len(legs) > _MAX_LEGS:
+            raise ValueError(f"A multi-leg order can have up to {_MAX_LEGS} legs.")
+
+        # Check the validity of every leg before building any of the payload
+        sides = self._check_legs(legs, VALID_OPTION_SIDES)
 
         # Start constructing the data payload
         data = {
@@ -312,32 +400,13 @@ class Orders(TradierApiBase):
             data["tag"] = tag
 
         # Add the details of each leg to the data payload
-        for index, leg in enumerate(legs):
-            # Check the validity of the leg data
-            if not isinstance(leg, OrderLeg):
-                raise ValueError(f"Leg at index {index} is not an OrderLeg object.")
-
-            if leg.side.lower() not in [
-                "buy_to_open",
-                "buy_to_close",
-                "sell_to_open",
-                "sell_to_close",
-            ]:
-                raise ValueError(
-                    f"Invalid side for leg at index {index}. Must be one of ['buy_to_open', 'buy_to_close', 'sell_to_open', 'sell_to_close']"
-                )
-
-            if not (isinstance(leg.quantity, (int, float))) or leg.quantity <= 0:
-                raise ValueError(
-                    f"Invalid quantity for leg at index {index}. Must be a positive number. Got {leg.quantity}"
-                )
-
-            data[f"option_symbol[{index}]"] = leg.option_symbol.upper()
-            data[f"side[{index}]"] = leg.side.lower()
-            data[f"quantity[{index}]"] = int(leg.quantity)
+        for keys, leg, side in zip(_LEG_KEYS, legs, sides):
+            data[keys[0]] = leg.option_symbol.upper()
+            data[keys[1]] = side
+            data[keys[2]] = int(leg.quantity)
 
         # Send the request to the Tradier API
-        response = self.send(self.ORDER_ENDPOINT, data)
+        response = self.send(self.ORDER_URL, data)
 
         # Return the response
         return response["order"]
@@ -361,6 +430,9 @@ class Orders(TradierApiBase):
         if len(legs) != 2:
             raise ValueError("An OCO order must have exactly 2 legs.")
 
+        # Check the validity of every leg before building any of the payload
+        sides = self._check_legs(legs, VALID_SIDES, integer_quantity=True)
+
         # Start constructing the data payload
         data = {
             "class": "oco",
@@ -371,49 +443,64 @@ class Orders(TradierApiBase):
             data["tag"] = tag
 
         # Add the details of each leg to the data payload
+        for keys, leg, side in zip(_LEG_KEYS, legs, sides):
+            # Only send the fields that are set on the leg
+            data[keys[1]] = side
+            data[keys[2]] = leg.quantity
+            if leg.option_symbol:
+                data[keys[0]] = leg.option_symbol.upper()
+            if leg.stock_symbol:
+                data[keys[6]] = leg.stock_symbol.upper()
+            if leg.price:
+                data[keys[3]] = leg.price
+            if leg.stop:
+                data[keys[4]] = leg.stop
+            if leg.type:
+                data[keys[5]] = leg.type
+
+        # Send the request to the Tradier API
+        response = self.send(self.ORDER_URL, data)
+
+        # Return the response
+        return response["order"]
+
+    @staticmethod
+    def _check_legs(legs: list[OrderLeg], valid_sides: frozenset, integer_quantity: bool = False) -> list[str]:
+        """
+        Validate the legs of a multileg or OCO order in a single pass, raising on the first invalid leg.
+        :param legs: List of OrderLeg objects
+        :param valid_sides: Sides allowed for the legs
+        :param integer_quantity: Require integer quantities rather than any positive number
+        :return: List of the lowercased sides of the legs
+        """
+        quantity_types = int if integer_quantity else (int, float)
+        sides = []
         for index, leg in enumerate(legs):
-            # Check the validity of the leg data
             if not isinstance(leg, OrderLeg):
                 raise ValueError(f"Leg at index {index} is not an OrderLeg object.")
 
-            if leg.side.lower() not in [
-                "buy",
-                "buy_to_cover",
-                "sell",
-                "sell_short",
-                "buy_to_open",
-                "buy_to_close",
-                "sell_to_open",
-                "sell_to_close",
-            ]:
-                raise ValueError(
-                    f"Invalid side for leg at index {index}. Must be one of ['buy_to_open', 'buy_to_close', 'sell_to_open', 'sell_to_close']"
-                )
+            side = leg.side.lower()
+            if side not in valid_sides:
+                raise ValueError(f"Invalid side for leg at index {index}. Must be one of {sorted(valid_sides)}")
 
-            if not isinstance(leg.quantity, int) or leg.quantity <= 0:
+            if not isinstance(leg.quantity, quantity_types) or leg.quantity <= 0:
                 raise ValueError(
-                    f"Invalid quantity for leg at index {index}. Must be a positive integer."
+                    f"Invalid quantity for leg at index {index}. Must be a positive "
+                    f"{'integer' if integer_quantity else 'number'}. Got {leg.quantity}"
                 )
+            sides.append(side)
 
-            data[f"option_symbol[{index}]"] = leg.option_symbol.upper() if leg.option_symbol else None
-            data[f"symbol[{index}]"] = leg.stock_symbol.upper() if leg.stock_symbol else None
-            data[f"side[{index}]"] = leg.side.lower() if leg.side else None
-            data[f"quantity[{index}]"] = int(leg.quantity) if leg.quantity else None
-            data[f"price[{index}]"] = leg.price if leg.price else None
-            data[f"stop[{index}]"] = leg.stop if leg.stop else None
-            data[f"type[{index}]"] = leg.type if leg.type else None
-
-        # Send the request to the Tradier API
-        response = self.send(self.ORDER_ENDPOINT, data)
-
-        # Return the response
-        return response["order"]
+        return sides
 
     @staticmethod
     def _update_order_payload(payload, limit_price, order_type, stop_price, tag):
-        if order_type.lower() == "limit" or order_type.lower() == "stop_limit":
+        """
+        Add the prices and tag to an order payload.
+        :param order_type: Lowercased order type, as returned by _check_order_inputs()
+        """
+        if order_type in _NEEDS_LIMIT:
             payload["price"] = round(limit_price, 2)
-        if order_type.lower() == "stop" or order_type.lower() == "stop_limit":
+        if order_type in _NEEDS_STOP:
             payload["stop"] = round(stop_price, 2)
         if tag:
             payload["tag"] = tag
@@ -421,18 +508,26 @@ class Orders(TradierApiBase):
         return payload
 
     def _check_order_inputs(self, duration, limit_price, order_type, stop_price, tag):
-        if order_type.lower() not in self.valid_order_types:
+        """
+        Validate the common order inputs.
+        :return: Tuple of the lowercased (order_type, duration), so callers don't have to lowercase them again
+        """
+        ot = order_type.lower()
+        dur = duration.lower()
+        if ot not in VALID_ORDER_TYPES:
             raise ValueError(
-                f"Invalid order_type. Must be one of {self.valid_order_types}"
+                f"Invalid order_type. Must be one of {sorted(VALID_ORDER_TYPES)}"
             )
-        if duration.lower() not in self.valid_durations:
-            raise ValueError(f"Invalid duration. Must be one of {self.valid_durations}")
-        if order_type.lower() in ["limit", "stop_limit"] and not limit_price:
+        if dur not in VALID_DURATIONS:
+            raise ValueError(f"Invalid duration. Must be one of {sorted(VALID_DURATIONS)}")
+        if ot in _NEEDS_LIMIT and not limit_price:
             raise ValueError(f"Limit price is required for order_type {order_type}")
-        if order_type.lower() in ["stop", "stop_limit"] and not stop_price:
+        if ot in _NEEDS_STOP and not stop_price:
             raise ValueError(f"Stop price is required for order_type {order_type}")
         # Check that 'tag' only has letters, mumbers and dash (-)
-        if tag and not re.match(r"^[a-zA-Z0-9-]+$", tag):
+        if tag and not _TAG_CHARS.issuperset(tag):
             raise ValueError(
                 f"Invalid tag {tag}. Must be letters, numbers and dash (-) characters"
             )
+
+        return ot, dur
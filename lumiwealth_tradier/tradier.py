@@ -1,4 +1,7 @@
+from functools import cached_property
+
 from .account import Account
+from .base import _new_session
 from .market import MarketData
 from .orders import Orders
 
@@ -10,6 +13,20 @@ class Tradier:
         self.ACCOUNT_NUMBER = account_number
         self.AUTH_TOKEN = auth_token
 
-        self.account = Account(self.ACCOUNT_NUMBER, self.AUTH_TOKEN, is_paper)
-        self.orders = Orders(self.ACCOUNT_NUMBER, self.AUTH_TOKEN, is_paper)
-        self.market = MarketData(self.ACCOUNT_NUMBER, self.AUTH_TOKEN, is_paper)
+        # One http session is shared by all the API clients, so they reuse the same pool of keep-alive
+        # connections to Tradier instead of each paying for its own TCP+TLS handshakes
+        self._session = _new_session()
+
+    # The API clients are created on first use, so e.g. a script that only needs market data doesn't set up the
+    # account and order clients
+    @cached_property
+    def account(self) -> Account:
+        return Account(self.ACCOUNT_NUMBER, self.AUTH_TOKEN, self.is_paper, session=self._session)
+
+    @cached_property
+    def orders(self) -> Orders:
+        return Orders(self.ACCOUNT_NUMBER, self.AUTH_TOKEN, self.is_paper, session=self._session)
+
+    @cached_property
+    def market(self) -> MarketData:
+        return MarketData(self.ACCOUNT_NUMBER, self.AUTH_TOKEN, self.is_paper, session=self._session)
@@ -16,6 +16,7 @@ setup(
     packages=find_packages(),
     project_urls={"Bug Tracker": "https://github.com/Lumiwealth/lumiwealth-tradier/issues"},
     keywords="tradier finance api",
-    install_requires=["pandas>=2.0.0", "numpy"],
+    install_requires=["pandas>=2.0.0", "numpy", "requests"],
+    extras_require={"fast": ["orjson", "ijson"], "arrow": ["pyarrow"]},
     python_requires=">=3.9",
 )
@@ -8,16 +8,26 @@ logger = logging.getLogger(__name__)
 found_dotenv = False
 
 
+def _find_dotenv(base_dir: Path):
+    # Walk up from base_dir towards the filesystem root rather than down through the whole tree below it, which
+    # only stats one file per directory level and can't pick up a .env from a nested virtualenv or dependency
+    for parent in (base_dir, *base_dir.parents):
+        dotenv_path = parent / '.env'
+        logger.debug("Checking %s for .env file", parent)
+        if dotenv_path.is_file():
+            return dotenv_path
+
+    return None
+
+
 def find_and_load_dotenv(base_dir) -> bool:
-    for root, dirs, files in os.walk(base_dir):
-        logger.debug(f"Checking {root} for .env file")
-        if '.env' in files:
-            dotenv_path = os.path.join(root, '.env')
-            load_dotenv(dotenv_path)
-            logger.info(f".env file loaded from: {dotenv_path}")
-            return True
+    dotenv_path = _find_dotenv(Path(base_dir).resolve())
+    if dotenv_path is None:
+        return False
 
-    return False
+    load_dotenv(dotenv_path)
+    logger.info(".env file loaded from: %s", dotenv_path)
+    return True
 
 
 # First check for a .secrets folder. Unsure why this would load ALL the .envs in the folder but leaving
@@ -25,7 +35,7 @@ def find_and_load_dotenv(base_dir) -> bool:
 # Load sensitive information such as API keys from .env files so that they are not stored in the repository
 # but can still be accessed by the tests through os.environ
 secrets_path = Path(__file__).parent.parent / '.secrets'
-if secrets_path.exists():
+if secrets_path.is_dir():
     for secret_file in secrets_path.glob('*.env'):
         load_dotenv(secret_file)
         found_dotenv = True
@@ -33,14 +43,14 @@ if secrets_path.exists():
 
 # Next, check the directory where script is being run
 script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
-logger.debug(f"script_dir: {script_dir}")
+logger.debug("script_dir: %s", script_dir)
 found_dotenv = find_and_load_dotenv(script_dir)
 
 if not found_dotenv:
     # Lastly, check the root directory of the project. This should probably be checked first,
     # since it's what the readme says to do.
     cwd_dir = os.getcwd()
-    logger.debug(f"cwd_dir: {cwd_dir}")
+    logger.debug("cwd_dir: %s", cwd_dir)
     found_dotenv = find_and_load_dotenv(cwd_dir)
 
 # If no .env file was found, print a warning message
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from lumiwealth_tradier.tradier import Tradier
+
+
+def pytest_collection_modifyitems(config, items):
+    # Tests marked "live" call the Tradier paper trading API. Without credentials they can only fail (slowly, after
+    # retrying), so skip them and still run the offline tests.
+    if os.getenv('TRADIER_ACCOUNT_NUMBER') and os.getenv('TRADIER_PAPER_TOKEN'):
+        return
+
+    skip_live = pytest.mark.skip(reason="TRADIER_ACCOUNT_NUMBER and TRADIER_PAPER_TOKEN are not set")
+    for item in items:
+        if 'live' in item.keywords:
+            item.add_marker(skip_live)
+
+
+# One client (and http session) is shared by the whole test run. Tests that mock a client method with mocker
+# are still isolated, because mocker undoes its patches at the end of each test.
+@pytest.fixture(scope='session')
+def tradier():
+    tradier_acct = os.getenv('TRADIER_ACCOUNT_NUMBER')
+    tradier_token = os.getenv('TRADIER_PAPER_TOKEN')
+    return Tradier(tradier_acct, tradier_token, is_paper=True)
@@ -1,24 +1,62 @@
-import os
+import json
 
 import pytest
 
-from lumiwealth_tradier.tradier import Tradier
-
-
-@pytest.fixture
-def tradier():
-    tradier_acct = os.getenv('TRADIER_ACCOUNT_NUMBER')
-    tradier_token = os.getenv('TRADIER_PAPER_TOKEN')
-    return Tradier(tradier_acct, tradier_token, is_paper=True)
+from lumiwealth_tradier.account import Account
 
 
 class TestAccount:
+    @pytest.mark.live
     def test_profile(self, tradier):
         df = tradier.account.get_user_profile()
         assert df is not None
         assert 'account.classification' in df.columns
 
+    @pytest.mark.live
     def test_account_balance(self, tradier):
         df = tradier.account.get_account_balance()
         assert df is not None
         assert 'total_cash' in df.columns
+
+    def test_positions_not_cached_by_default(self, mocker):
+        account = Account('VA000000', 'token')
+        body = {'positions': {'position': [{'cost_basis': 150.0, 'id': 1, 'quantity': 1.0, 'symbol': 'AAPL'}]}}
+        response = mocker.Mock(status_code=200, content=json.dumps(body).encode())
+        response.json.return_value = body
+        get = mocker.patch.object(account._session, 'get', return_value=response)
+
+        # An order can fill between two calls, so each one asks the API
+        account.get_positions()
+        account.get_positions()
+        assert get.call_count == 2
+
+        account.get_positions(cache_ttl=5)
+        account.get_positions(cache_ttl=5)
+        assert get.call_count == 3
+
+    def test_positions_with_quotes(self, tradier, mocker):
+        positions = {'positions': {'position': [
+            {'cost_basis': 150.0, 'id': 1, 'quantity': 1.0, 'symbol': 'AAPL'},
+            {'cost_basis': 300.0, 'id': 2, 'quantity': 2.0, 'symbol': 'MSFT'},
+        ]}}
+        quotes = {'quotes': {'quote': [
+            {'symbol': 'AAPL', 'last': 190.0},
+            {'symbol': 'MSFT', 'last': 400.0},
+        ]}}
+
+        quote_params = []
+
+        def fake_request(endpoint, params=None, **kwargs):
+            if endpoint.endswith('/markets/quotes'):
+                quote_params.append(params)
+                return quotes
+            return positions
+
+        mocker.patch.object(Account, 'request', side_effect=fake_request)
+        df = tradier.account.get_positions_with_quotes()
+        assert list(df['symbol']) == ['AAPL', 'MSFT']
+        assert list(df['last']) == [190.0, 400.0]
+        assert 'quantity' in df.columns
+
+        # All the quotes are fetched with a single request
+        assert quote_params == [{'symbols': 'AAPL,MSFT'}]
@@ -0,0 +1,46 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from lumiwealth_tradier.cache import FileCache
+
+
+class TestFileCache:
+    def test_get_set_ttl(self, tmp_path):
+        cache = FileCache(tmp_path)
+        params = {'month': '01', 'year': '2024'}
+        assert cache.get('v1/markets/calendar', params, ttl=60) is None
+
+        cache.set('v1/markets/calendar', params, {'calendar': {'month': 1}})
+        assert cache.get('v1/markets/calendar', params, ttl=60) == {'calendar': {'month': 1}}
+        # Parameter order doesn't matter, but values do
+        assert cache.get('v1/markets/calendar', {'year': '2024', 'month': '01'}, ttl=60) is not None
+        assert cache.get('v1/markets/calendar', {'month': '02', 'year': '2024'}, ttl=60) is None
+        # Expired
+        assert cache.get('v1/markets/calendar', params, ttl=-1) is None
+
+        cache.clear()
+        assert cache.get('v1/markets/calendar', params, ttl=60) is None
+
+    def test_env_dir_and_unreadable_entries(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('TRADIER_CACHE_DIR', str(tmp_path))
+        cache = FileCache()
+        assert cache.cache_dir == tmp_path
+
+        path = cache._path('v1/markets/lookup', {'q': 'SPY'})
+        os.makedirs(path.parent)
+        path.write_text('not json')
+        assert cache.get('v1/markets/lookup', {'q': 'SPY'}, ttl=60) is None
+
+    def test_concurrent_set_of_one_entry(self, tmp_path, caplog):
+        cache = FileCache(tmp_path)
+        params = {'symbol': 'SPY'}
+        payload = {'history': {'day': [{'date': '2024-01-02', 'close': 470.0}] * 2000}}
+
+        with caplog.at_level(logging.DEBUG, logger='lumiwealth_tradier.cache'):
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(lambda _: cache.set('v1/markets/history', params, payload), range(64)))
+
+        assert 'Unable to write' not in caplog.text
+        assert cache.get('v1/markets/history', params, ttl=60) == payload
+        assert not list(tmp_path.glob('*/*.tmp'))
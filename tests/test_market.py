@@ -1,20 +1,20 @@
+import asyncio
 import datetime as dt
-import os
 import re
+import time
 
+import pandas as pd
 import pytest
 
-from lumiwealth_tradier.tradier import Tradier
+from lumiwealth_tradier.market import MarketData
 
-
-@pytest.fixture
-def tradier():
-    tradier_acct = os.getenv('TRADIER_ACCOUNT_NUMBER')
-    tradier_token = os.getenv('TRADIER_PAPER_TOKEN')
-    return Tradier(tradier_acct, tradier_token, is_paper=True)
+# OCC option symbols of SPY calls and puts, e.g. SPY231215C00400000
+SPY_CALL_RE = re.compile(r'SPY\d+C\d+')
+SPY_PUT_RE = re.compile(r'SPY\d+P\d+')
 
 
 class TestMarket:
+    @pytest.mark.live
     def test_quote(self, tradier):
         df = tradier.market.get_quotes(['AAPL', 'MSFT', 'bad_symbol'])
         assert df is not None
@@ -27,27 +27,94 @@ class TestMarket:
             tradier.market.get_last_price('bad_symbol')
 
         assert tradier.market.get_last_price('AAPL') > 0
-        
+
+    def test_quotes_joins_symbols_once(self, tradier, mocker):
+        response = {'quotes': {'quote': [{'symbol': 'AAPL', 'last': 190.5}, {'symbol': 'MSFT', 'last': 370.0}]}}
+        request = mocker.patch.object(tradier.market, 'request', return_value=response)
+        df = tradier.market.get_quotes(['AAPL', 'MSFT'])
+        assert request.call_args.args[1]['symbols'] == 'AAPL,MSFT'
+        assert len(df) == 2
+        assert list(df.index) == ['AAPL', 'MSFT']
+
+    def test_quotes_with_greeks(self, tradier, mocker):
+        response = {'quotes': {'quote': [
+            {'symbol': 'SPY231215C00400000', 'last': 55.1, 'greeks': {'delta': 0.98, 'gamma': 0.001}},
+            {'symbol': 'SPY231215P00400000', 'last': 0.02, 'greeks': {'delta': -0.01, 'gamma': 0.0005}},
+        ]}}
+        request = mocker.patch.object(tradier.market, 'request', return_value=response)
+        df = tradier.market.get_quotes(['SPY231215C00400000', 'SPY231215P00400000'], greeks=True)
+        assert request.call_count == 1
+        assert request.call_args.args[1] == {'symbols': 'SPY231215C00400000,SPY231215P00400000', 'greeks': True}
+        assert {'greeks.delta', 'greeks.gamma'} <= set(df.columns)
+        assert df.loc['SPY231215P00400000', 'greeks.delta'] == -0.01
+
+    def test_last_price_reads_json(self, tradier, mocker):
+        request = mocker.patch.object(tradier.market, 'request',
+                                      return_value={'quotes': {'quote': {'symbol': 'BRK/B', 'last': 360}}})
+        assert tradier.market.get_last_price('BRK.B') == 360.0
+        assert request.call_args.args[1] == {'symbols': 'BRK/B', 'greeks': False}
+
+        request.return_value = {'quotes': {'unmatched_symbols': {'symbol': 'bad_symbol'}}}
+        with pytest.raises(ValueError):
+            tradier.market.get_last_price('bad_symbol')
+
+    def test_last_prices_single_request(self, tradier, mocker):
+        response = {'quotes': {'quote': [{'symbol': 'AAPL', 'last': 190.5}, {'symbol': 'BRK/B', 'last': 360.25}]}}
+        request = mocker.patch.object(tradier.market, 'request', return_value=response)
+        prices = tradier.market.get_last_prices(['AAPL', 'BRK.B'])
+        assert request.call_count == 1
+        assert request.call_args.args[1] == {'symbols': 'AAPL,BRK/B', 'greeks': False}
+        assert prices['AAPL'] == 190.5
+        assert prices['BRK.B'] == 360.25
+
+    def test_last_price_reuses_recent_quotes(self, tradier, mocker):
+        market = MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN', use_file_cache=False)
+        response = {'quotes': {'quote': [{'symbol': 'AAPL', 'last': 190.5}, {'symbol': 'BRK/B', 'last': None}]}}
+        request = mocker.patch.object(market, 'request', return_value=response)
+        market.get_quotes(['AAPL', 'BRK.B'])
+        assert market.get_last_price('aapl') == 190.5
+        assert market.get_last_price('BRK.B') is None
+        assert request.call_count == 1
+
+        # When no returned quote has traded, the whole "last" column is None
+        request.return_value = {'quotes': {'quote': {'symbol': 'SPY250101C00999000', 'last': None, 'bid': 0.0}}}
+        df = market.get_quotes('SPY250101C00999000')
+        assert df.loc['SPY250101C00999000', 'bid'] == 0.0
+        assert market.get_last_price('SPY250101C00999000') is None
+        assert request.call_count == 2
+
+        # Once the quotes are older than LAST_PRICE_CACHE_TTL the price is requested again
+        mocker.patch('lumiwealth_tradier.market.time.monotonic', return_value=time.monotonic() + 5)
+        request.return_value = {'quotes': {'quote': {'symbol': 'AAPL', 'last': 191}}}
+        assert market.get_last_price('AAPL') == 191.0
+        assert request.call_count == 3
+        assert market.get_last_price('AAPL') == 191.0
+        assert request.call_count == 3
+
+        # Prices of symbols that were quoted earlier aren't kept around
+        assert set(market._last_prices) == {'AAPL'}
+
+    @pytest.mark.live
     def test_quote_options(self, tradier):
         # Test getting a quote for an option
         df_expr = tradier.market.get_option_expirations('SPY')
         assert df_expr is not None
         expr_date = df_expr.index[0]
-        strike = df_expr.iloc[0]['strikes'][0]
+        strike = df_expr['strikes'].iat[0][0]
 
         # Get the option chains
         df = tradier.market.get_option_chains('SPY', expr_date)
         assert df is not None
         assert len(df) > 0
         assert 'strike' in df.columns
-        assert df.iloc[0]['strike'] > 0
+        assert df['strike'].iat[0] > 0
 
         # Get the option symbols - lookup chains
         symbol = tradier.market.get_option_symbol('SPY', expr_date, strike, 'call')
         assert symbol is not None
         assert isinstance(symbol, str)
         assert symbol != ''
-        assert re.match(r'SPY\d+C\d+', symbol)
+        assert SPY_CALL_RE.match(symbol)
 
         # Get the quote for the option
         df = tradier.market.get_quotes([symbol])
@@ -55,18 +122,19 @@ class TestMarket:
         assert 'last' in df.columns
         assert df.loc[symbol]['last'] > 0
 
+    @pytest.mark.live
     def test_historical_quote(self, tradier):
         # Multiple row return
         df = tradier.market.get_historical_quotes('SPY', start_date='2023-12-01', end_date='2023-12-07')
         assert df is not None
         assert 'open' in df.columns
-        assert df.iloc[0]['open'] > 0
+        assert df['open'].iat[0] > 0
 
         # Single row return
         df = tradier.market.get_historical_quotes('SPY', start_date='2023-12-01', end_date='2023-12-01')
         assert df is not None
         assert 'open' in df.columns
-        assert df.iloc[0]['open'] > 0
+        assert df['open'].iat[0] > 0
 
         # Error Check Inputs
         with pytest.raises(ValueError):
@@ -74,6 +142,34 @@ class TestMarket:
         with pytest.raises(ValueError):
             tradier.market.get_historical_quotes('SPY', start_date='2023-12-01', session_filter='bad_session_filter')
 
+    def test_historical_quote_file_cache(self, tradier, mocker, monkeypatch, tmp_path):
+        monkeypatch.setenv('TRADIER_CACHE_DIR', str(tmp_path))
+        market = MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN')
+        response = {'history': {'day': {'date': '2023-12-01', 'open': 455.77, 'close': 459.1}}}
+        request = mocker.patch.object(market, 'request', return_value=response)
+        for _ in range(2):
+            df = market.get_historical_quotes('SPY', start_date='2023-12-01', end_date='2023-12-01')
+            assert df.loc[dt.date(2023, 12, 1), 'open'] == 455.77
+        assert request.call_count == 1
+
+        # Today's bar may still change, so ranges ending today always go to the API
+        today = pd.Timestamp.now(tz='US/Eastern').date()
+        for _ in range(2):
+            market.get_historical_quotes('SPY', start_date='2023-12-01', end_date=today)
+        assert request.call_count == 3
+
+        # The cache can be skipped per call
+        market.get_historical_quotes('SPY', start_date='2023-12-01', end_date='2023-12-01', cache_ttl=None)
+        assert request.call_count == 4
+
+        # And is never used by clients that didn't opt into the file cache
+        market = MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN', use_file_cache=False)
+        request = mocker.patch.object(market, 'request', return_value=response)
+        for _ in range(2):
+            market.get_historical_quotes('SPY', start_date='2023-12-01', end_date='2023-12-01')
+        assert request.call_count == 2
+
+    @pytest.mark.live
     def test_timesales(self, tradier, mocker):
         # Error test valid values
         with pytest.raises(ValueError):
@@ -89,23 +185,43 @@ class TestMarket:
         df = tradier.market.get_timesales('SPY', start_date=start_date, end_date=end_date)
         assert len(df)
         assert 'price' in df.columns
-        assert df.iloc[0]['price'] > 0
+        assert df['price'].iat[0] > 0
 
         mocker.patch.object(tradier.market, 'request', return_value={'series': 'null'})
         with pytest.raises(LookupError):
             tradier.market.get_timesales('SPY', start_date=start_date, end_date=end_date)
 
+    @pytest.mark.live
     def test_option_expirations(self, tradier):
         df = tradier.market.get_option_expirations('SPY', include_all_roots=True)
         assert df is not None
         assert len(df) > 0
         assert 'strikes' in df.columns
-        assert isinstance(df.iloc[0]['strikes'], list)
-        assert isinstance(df.iloc[0]['strikes'][0], float)
+        assert isinstance(df['strikes'].iat[0], list)
+        assert isinstance(df['strikes'].iat[0][0], float)
 
         with pytest.raises(LookupError):
             tradier.market.get_option_expirations('bad_symbol')
 
+    def test_option_expirations_memoized(self, tradier, mocker):
+        market = MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN', use_file_cache=False)
+        response = {'expirations': {'expiration': [
+            {'date': '2023-12-15', 'contract_size': 100, 'expiration_type': 'standard',
+             'strikes': {'strike': [400.0, 405.0]}},
+            {'date': '2023-12-22', 'contract_size': 100, 'expiration_type': 'weeklys', 'strikes': {'strike': 400.0}},
+        ]}}
+        request = mocker.patch.object(market, 'request', return_value=response)
+        df = market.get_option_expirations('SPY')
+        df.loc[dt.date(2023, 12, 15), 'contract_size'] = 0  # Modifying the result doesn't touch the cache
+        df = market.get_option_expirations('SPY')
+        assert request.call_count == 1
+        assert df.loc[dt.date(2023, 12, 15), 'contract_size'] == 100
+        assert df.loc[dt.date(2023, 12, 15), 'strikes'] == [400.0, 405.0]
+
+        market.get_option_expirations('SPY', include_all_roots=True)
+        assert request.call_count == 2
+
+    @pytest.mark.live
     def test_option_chains(self, tradier):
         # Need a valid options date ... so look one up from the expirations
         df_expr = tradier.market.get_option_expirations('SPY')
@@ -117,11 +233,51 @@ class TestMarket:
         assert df is not None
         assert len(df) > 0
         assert 'strike' in df.columns
-        assert df.iloc[0]['strike'] > 0
+        assert df['strike'].iat[0] > 0
 
         with pytest.raises(LookupError):
             tradier.market.get_option_chains('bad_symbol', '2023-12-01')
 
+    def test_option_chains_multi(self, tradier, mocker):
+        def fake_request(endpoint, params, required_response_key=None):
+            expiration = params['expiration']
+            return {'options': {'option': {'symbol': f"SPY{expiration}C", 'strike': 400.0, 'option_type': 'call',
+                                           'expiration_date': expiration}}}
+
+        mocker.patch.object(tradier.market, 'request', side_effect=fake_request)
+        expirations = [dt.date(2023, 12, 15), dt.date(2023, 12, 22), '2023-12-29']
+        chains = tradier.market.get_option_chains_multi('SPY', expirations)
+        assert list(chains) == expirations
+        assert chains[dt.date(2023, 12, 22)]['symbol'].iat[0] == 'SPY2023-12-22C'
+        assert chains['2023-12-29']['expiration_date'].iat[0] == dt.date(2023, 12, 29)
+
+        async def gather():
+            return await asyncio.gather(*[tradier.market.aget_option_chains('SPY', e) for e in expirations])
+
+        for df, expected in zip(asyncio.run(gather()), chains.values()):
+            assert df.equals(expected)
+
+    def test_option_chains_pyarrow(self, tradier, mocker):
+        pytest.importorskip('pyarrow')
+        response = {'options': {'option': [
+            {'symbol': 'SPY231215C00400000', 'strike': 400.0, 'option_type': 'call', 'expiration_date': '2023-12-15',
+             'greeks': {'delta': 0.98}},
+            {'symbol': 'SPY231215P00400000', 'strike': 400.0, 'option_type': 'put', 'expiration_date': '2023-12-15',
+             'greeks': {'delta': -0.01}},
+        ]}}
+        mocker.patch.object(tradier.market, 'request', return_value=response)
+        df = tradier.market.get_option_chains('SPY', '2023-12-15', greeks=True, dtype_backend='pyarrow')
+        assert isinstance(df['strike'].dtype, pd.ArrowDtype)
+        assert df['greeks.delta'].iat[1] == -0.01
+        assert df['expiration_date'].iat[0] == dt.date(2023, 12, 15)
+        assert isinstance(df['option_type'].dtype, pd.CategoricalDtype)
+        assert (df['option_type'] == 'put').sum() == 1
+        assert tradier.market.get_option_symbol('SPY', '2023-12-15', 400, 'put', chains=df) == 'SPY231215P00400000'
+
+        with pytest.raises(ValueError):
+            tradier.market.get_option_chains('SPY', '2023-12-15', dtype_backend='bad_backend')
+
+    @pytest.mark.live
     def test_get_option_strikes(self, tradier):
         # Need a valid options date ... so look one up from the expirations
         df_expr = tradier.market.get_option_expirations('SPY')
@@ -138,26 +294,27 @@ class TestMarket:
         with pytest.raises(LookupError):
             tradier.market.get_option_strikes('bad_symbol', '2023-12-01')
 
+    @pytest.mark.live
     def test_get_option_symbol(self, tradier):
         # Need a valid options date ... so look one up from the expirations
         df_expr = tradier.market.get_option_expirations('SPY')
         assert df_expr is not None
         expr_date = df_expr.index[0]
-        strike = df_expr.iloc[0]['strikes'][0]
+        strike = df_expr['strikes'].iat[0][0]
 
         # Get the option symbols - lookup chains
         symbol = tradier.market.get_option_symbol('SPY', expr_date, strike, 'call')
         assert symbol is not None
         assert isinstance(symbol, str)
         assert symbol != ''
-        assert re.match(r'SPY\d+C\d+', symbol)
+        assert SPY_CALL_RE.match(symbol)
 
         # Pass chains in so additional lookups aren't required
         chains_df = tradier.market.get_option_chains('SPY', expr_date)
         assert chains_df is not None
         symbol = tradier.market.get_option_symbol('SPY', expr_date, strike, 'put', chains_df)
         assert symbol != ''
-        assert re.match(r'SPY\d+P\d+', symbol)
+        assert SPY_PUT_RE.match(symbol)
 
         # Unkown Strike
         with pytest.raises(LookupError):
@@ -166,27 +323,113 @@ class TestMarket:
         with pytest.raises(LookupError):
             tradier.market.get_option_symbol('bad_symbol', '2023-12-01', 100, 'call')
 
+    def test_get_option_symbol_from_chains(self, tradier, mocker):
+        chains = pd.DataFrame({
+            'symbol': ['SPY231215C00400000', 'SPY231215P00400000', 'SPY231215C00405000'],
+            'strike': [400.0, 400.0, 405.0],
+            'option_type': ['call', 'put', 'call'],
+        })
+        request = mocker.patch.object(tradier.market, 'request')
+        assert tradier.market.get_option_symbol('SPY', '2023-12-15', 400, 'put', chains=chains) == 'SPY231215P00400000'
+        assert tradier.market.get_option_symbol('SPY', '2023-12-15', 405.0, 'CALL', chains=chains) == \
+            'SPY231215C00405000'
+        with pytest.raises(LookupError):
+            tradier.market.get_option_symbol('SPY', '2023-12-15', 410.0, 'call', chains=chains)
+        assert request.call_count == 0
+
+        # A different chains DataFrame is not served from the previous lookup
+        chains = chains.assign(symbol=chains['symbol'].str.replace('231215', '231222'))
+        assert tradier.market.get_option_symbol('SPY', '2023-12-22', 400, 'put', chains=chains) == 'SPY231222P00400000'
+
+    @pytest.mark.live
     def test_get_clock(self, tradier):
         data = tradier.market.get_clock()
         assert data is not None
         assert 'state' in data
         assert data['state'] in ['open', 'closed', 'premarket', 'postmarket']
 
+    @pytest.mark.live
     def test_get_calendar(self, tradier):
         df = tradier.market.get_calendar(11, 2023)
         assert df is not None
         assert 'status' in df.columns
-        assert df.iloc[0]['status'] in ['open', 'closed']
-
+        assert df['status'].iat[0] in ['open', 'closed']
+
+    def test_file_cache_is_opt_in(self, monkeypatch, tmp_path):
+        monkeypatch.delenv('TRADIER_CACHE_DIR', raising=False)
+        assert MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN')._file_cache is None
+
+        monkeypatch.setenv('TRADIER_CACHE_DIR', str(tmp_path))
+        assert MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN')._file_cache.cache_dir == tmp_path
+        assert MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN', use_file_cache=False)._file_cache is None
+
+    def test_get_calendar_file_cache(self, tradier, mocker, monkeypatch, tmp_path):
+        monkeypatch.setenv('TRADIER_CACHE_DIR', str(tmp_path))
+        market = MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN')
+        response = {'calendar': {'month': 1, 'year': 2024, 'days': {'day': [
+            {'date': '2024-01-01', 'status': 'closed'},
+            {'date': '2024-01-02', 'status': 'open', 'open': {'start': '09:30', 'end': '16:00'}},
+        ]}}}
+        request = mocker.patch.object(market, 'request', return_value=response)
+        df = market.get_calendar(1, 2024)
+        assert request.call_count == 1
+
+        # Served from disk, even by a new client
+        market = MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN')
+        request = mocker.patch.object(market, 'request', return_value=response)
+        assert market.get_calendar(1, 2024).equals(df)
+        assert request.call_count == 0
+        assert market.get_previous_trading_day(dt.date(2024, 1, 3)) == dt.date(2024, 1, 2)
+        assert market.get_previous_trading_day(dt.datetime(2024, 1, 3, 9, 30)) == dt.date(2024, 1, 2)
+        assert market.get_previous_trading_day('2024-01-03') == dt.date(2024, 1, 2)
+        assert request.call_count == 0
+
+    def test_get_calendar_memoized(self, tradier, mocker):
+        market = MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN', use_file_cache=False)
+        response = {'calendar': {'month': 1, 'year': 2024, 'days': {'day': [
+            {'date': '2024-01-01', 'status': 'closed'},
+            {'date': '2024-01-02', 'status': 'open'},
+        ]}}}
+        request = mocker.patch.object(market, 'request', return_value=response)
+        df = market.get_calendar(1, 2024)
+        df.loc[dt.date(2024, 1, 2), 'status'] = 'closed'  # Modifying the result doesn't touch the cache
+        assert market.get_calendar(1, 2024).loc[dt.date(2024, 1, 2), 'status'] == 'open'
+        assert market.get_previous_trading_day(dt.date(2024, 1, 3)) == dt.date(2024, 1, 2)
+        assert request.call_count == 1
+
+    def test_previous_trading_day_month_boundary(self, mocker):
+        market = MarketData('ACCOUNT_NUMBER', 'AUTH_TOKEN', use_file_cache=False)
+        calendars = {
+            ('01', '2024'): [{'date': '2024-01-30', 'status': 'open'}, {'date': '2024-01-31', 'status': 'open'}],
+            ('02', '2024'): [{'date': '2024-02-01', 'status': 'open'}, {'date': '2024-02-02', 'status': 'open'}],
+            ('12', '2023'): [{'date': '2023-12-31', 'status': 'closed'}],
+        }
+
+        def fake_request(endpoint, params=None, **kwargs):
+            key = (params['month'], params['year'])
+            days = calendars.get(key, [{'date': f'{key[1]}-{key[0]}-01', 'status': 'closed'}])
+            return {'calendar': {'days': {'day': days}}}
+
+        request = mocker.patch.object(market, 'request', side_effect=fake_request)
+        assert market.get_previous_trading_day(dt.date(2024, 2, 1)) == dt.date(2024, 1, 31)
+        assert request.call_count == 2
+
+        # Only the month of the date and the one before it are searched
+        with pytest.raises(LookupError, match='2023-12-01'):
+            market.get_previous_trading_day(dt.date(2023, 12, 1))
+        assert request.call_count == 4
+
+    @pytest.mark.live
     def test_lookup_symbol(self, tradier):
         df = tradier.market.lookup_symbol('SPY')
         assert df is not None
         assert 'symbol' in df.columns
-        assert df.iloc[0]['symbol'] == 'SPY'
+        assert df['symbol'].iat[0] == 'SPY'
 
         with pytest.raises(LookupError):
             tradier.market.lookup_symbol('bad_symbol')
 
+    @pytest.mark.live
     def test_get_previous_trading_day(self, tradier):
         today = dt.date.today()
         trading_day = tradier.market.get_previous_trading_day()
@@ -197,6 +440,7 @@ class TestMarket:
 
         assert tradier.market.get_previous_trading_day(today) == trading_day
 
+    @pytest.mark.live
     def test_quote_for_brk(self, tradier):
         df = tradier.market.get_quotes(['BRK.B'])
         assert df is not None
@@ -1,16 +1,40 @@
-import os
+import asyncio
 
 import pytest
 
 from lumiwealth_tradier.base import TradierApiError
-from lumiwealth_tradier.tradier import Tradier
 
 
-@pytest.fixture
-def tradier():
-    tradier_acct = os.getenv('TRADIER_ACCOUNT_NUMBER')
-    tradier_token = os.getenv('TRADIER_PAPER_TOKEN')
-    return Tradier(tradier_acct, tradier_token, is_paper=True)
+# The SPY option tests all trade the same expiration, so it and its chain are only fetched once per test run
+@pytest.fixture(scope='session')
+def spy_expirations(tradier):
+    df_expr = tradier.market.get_option_expirations('SPY')
+    assert df_expr is not None
+    return df_expr
+
+
+@pytest.fixture(scope='session')
+def spy_chains(tradier, spy_expirations):
+    chains_df = tradier.market.get_option_chains('SPY', spy_expirations.index[1])
+    assert chains_df is not None
+    return chains_df
+
+
+@pytest.fixture(scope='session')
+def spy_straddle_legs(tradier, spy_expirations, spy_chains):
+    from lumiwealth_tradier.orders import OrderLeg
+
+    # Pick a strike from the middle of the list
+    df_expr = spy_expirations
+    strk_idx = int(len(df_expr['strikes'].iat[1]) / 2)
+    strike = df_expr['strikes'].iat[1][strk_idx]
+
+    call_symbol = tradier.market.get_option_symbol('SPY', df_expr.index[1], strike, 'call', chains=spy_chains)
+    put_symbol = tradier.market.get_option_symbol('SPY', df_expr.index[1], strike, 'put', chains=spy_chains)
+    return (
+        OrderLeg(option_symbol=call_symbol, quantity=1, side='buy_to_open'),
+        OrderLeg(option_symbol=put_symbol, quantity=1, side='buy_to_open'),
+    )
 
 
 class TestOrders:
@@ -26,6 +50,9 @@ class TestOrders:
         with pytest.raises(ValueError):
             tradier.orders.order(symbol='AAPL', quantity=1, side='buy', order_type='market', tag='bad tag !@#',
                                  duration='gtc')
+        with pytest.raises(ValueError):
+            tradier.orders.order(symbol='AAPL', quantity=1, side='buy', order_type='market', tag='unittest\n',
+                                 duration='gtc')
         # Missing limit_price
         with pytest.raises(ValueError):
             tradier.orders.order(symbol='AAPL', quantity=1, side='buy', order_type='limit', tag='unittest',
@@ -35,6 +62,104 @@ class TestOrders:
             tradier.orders.order(symbol='AAPL', quantity=1, side='buy', order_type='stop', tag='unittest',
                                  duration='gtc')
 
+    def test_get_orders_parsing(self, tradier, mocker):
+        orders = [
+            {'id': 8248093, 'type': 'stop_limit', 'symbol': 'UNP', 'side': 'buy', 'quantity': 3.0, 'status': 'open'},
+            {'id': 8255194, 'type': 'market', 'symbol': 'SPY', 'class': 'multileg', 'status': 'filled',
+             'leg': [{'id': 1, 'option_symbol': 'SPY231215C00400000'},
+                     {'id': 2, 'option_symbol': 'SPY231215P00400000'}]},
+        ]
+        mocker.patch.object(tradier.orders, 'request', return_value={'orders': {'order': orders}})
+        df = tradier.orders.get_orders()
+        assert list(df['id']) == [8248093, 8255194]
+        assert len(df['leg'].iat[1]) == 2
+
+        # A single order comes back as a dict rather than a list
+        mocker.patch.object(tradier.orders, 'request', return_value={'orders': {'order': orders[0]}})
+        assert list(tradier.orders.get_orders()['id']) == [8248093]
+
+        mocker.patch.object(tradier.orders, 'request', return_value={'order': orders[0]})
+        df = tradier.orders.get_order(8248093)
+        assert len(df) == 1
+        assert df['type'].iloc[0] == 'stop_limit'
+
+        mocker.patch.object(tradier.orders, 'request', return_value={'orders': 'null'})
+        df = tradier.orders.get_orders()
+        assert df.empty
+        assert 'status' in df.columns
+        df.loc[0, 'status'] = 'open'  # Callers get their own copy
+        assert tradier.orders.get_orders().empty
+
+        for response in ({}, {'orders': {}}, {'orders': None}):
+            mocker.patch.object(tradier.orders, 'request', return_value=response)
+            assert tradier.orders.get_orders().empty
+
+    def test_order_payload_is_normalized(self, tradier, mocker):
+        send = mocker.patch.object(tradier.orders, 'send', return_value={'order': {'id': 123, 'status': 'ok'}})
+        tradier.orders.order(symbol='brk.b', quantity=2.0, side='BUY', order_type='Limit', duration='GTC',
+                             limit_price=410.123, tag='unittest')
+        assert send.call_args.args[1] == {
+            'class': 'equity', 'symbol': 'BRK/B', 'option_symbol': '', 'side': 'buy', 'quantity': 2,
+            'type': 'limit', 'duration': 'gtc', 'price': 410.12, 'tag': 'unittest',
+        }
+
+    def test_multileg_order_payload(self, tradier, mocker):
+        from lumiwealth_tradier.orders import OrderLeg
+
+        send = mocker.patch.object(tradier.orders, 'send', return_value={'order': {'id': 123, 'status': 'ok'}})
+        legs = [OrderLeg(option_symbol='spy231215c00400000', quantity=1, side='BUY_TO_OPEN'),
+                OrderLeg(option_symbol='spy231215p00400000', quantity=2.0, side='sell_to_open')]
+        tradier.orders.multileg_order('spy', 'credit', 'day', legs, price=0.5, tag='unittest')
+        assert send.call_args.args[1] == {
+            'class': 'multileg', 'symbol': 'SPY', 'type': 'credit', 'duration': 'day', 'price': 0.5, 'tag': 'unittest',
+            'option_symbol[0]': 'SPY231215C00400000', 'side[0]': 'buy_to_open', 'quantity[0]': 1,
+            'option_symbol[1]': 'SPY231215P00400000', 'side[1]': 'sell_to_open', 'quantity[1]': 2,
+        }
+
+        # An invalid leg is rejected before anything is sent
+        legs.append(OrderLeg(option_symbol='spy231215p00405000', quantity=1, side='buy'))
+        with pytest.raises(ValueError):
+            tradier.orders.multileg_order('spy', 'credit', 'day', legs, price=0.5)
+        assert send.call_count == 1
+
+    def test_oco_order_payload_skips_unset_fields(self, tradier, mocker):
+        from lumiwealth_tradier.orders import OrderLeg
+
+        send = mocker.patch.object(tradier.orders, 'send', return_value={'order': {'id': 123, 'status': 'ok'}})
+        legs = [OrderLeg(stock_symbol='spy', quantity=1, side='sell', price=480.0, type='limit'),
+                OrderLeg(stock_symbol='spy', quantity=1, side='sell', stop=460.0, type='stop')]
+        tradier.orders.oco_order('GTC', legs)
+        assert send.call_args.args[1] == {
+            'class': 'oco', 'duration': 'gtc',
+            'side[0]': 'sell', 'quantity[0]': 1, 'symbol[0]': 'SPY', 'price[0]': 480.0, 'type[0]': 'limit',
+            'side[1]': 'sell', 'quantity[1]': 1, 'symbol[1]': 'SPY', 'stop[1]': 460.0, 'type[1]': 'stop',
+        }
+
+        # OCO legs need whole quantities
+        legs[1].quantity = 1.5
+        with pytest.raises(ValueError):
+            tradier.orders.oco_order('gtc', legs)
+        assert send.call_count == 1
+
+    def test_cancel_many(self, tradier, mocker):
+        def fake_delete(endpoint):
+            order_id = int(endpoint.rsplit('/', 1)[1])
+            if order_id == 3:
+                raise TradierApiError("400 - order already in finalized state")
+            return {'order': {'id': order_id, 'status': 'ok'}}
+
+        mocker.patch.object(tradier.orders, 'delete', side_effect=fake_delete)
+        assert [r['id'] for r in tradier.orders.cancel_many([1, 2, 3])] == [1, 2, 3]
+        assert asyncio.run(tradier.orders.cancel_async(2)) == {'id': 2, 'status': 'ok'}
+
+    def test_modify_without_duration(self, tradier, mocker):
+        send = mocker.patch.object(tradier.orders, 'send', return_value={'order': {'id': 123, 'status': 'ok'}})
+        assert tradier.orders.modify(123, stop_price=195.0) == {'id': 123, 'status': 'ok'}
+        assert send.call_args.args[1] == {'order_id': 123, 'stop': 195.0}
+        with pytest.raises(ValueError):
+            tradier.orders.modify(123, duration='bad_duration')
+
+    @pytest.mark.live
     def test_stock_order(self, tradier):
         # Invalid side for stocks
         with pytest.raises(TradierApiError):
@@ -43,8 +168,8 @@ class TestOrders:
         # Submit basic order
         basic_order = tradier.orders.order(symbol='AAPL', quantity=1, side='buy', order_type='market', tag='unittest')
         assert isinstance(basic_order, dict)
-        assert 'id' in basic_order.keys()
-        assert 'status' in basic_order.keys()
+        assert 'id' in basic_order
+        assert 'status' in basic_order
         assert basic_order['id'] > 0
 
         # Retrieve order status
@@ -57,31 +182,27 @@ class TestOrders:
         assert resp
         assert resp['id'] == basic_order['id']
 
-    def test_option_order(self, tradier):
+    @pytest.mark.live
+    def test_option_order(self, tradier, spy_expirations, spy_chains):
         # Invalid side for options
         with pytest.raises(ValueError):
             tradier.orders.order_option(asset_symbol='AAPL', option_symbol='', quantity=1, side='buy',
                                         order_type='market', tag='unittest')
 
-        # Lookup Expiration Date, Strike, and Option Symbol
-        df_expr = tradier.market.get_option_expirations('SPY')
-        assert df_expr is not None
-        expr_date = df_expr.index[1]
+        # Lookup Strike and Option Symbol
+        df_expr = spy_expirations
         # Pick a strike from the middle of the list
-        strk_idx = int(len(df_expr.iloc[0]['strikes']) / 2)
-        strike = df_expr.iloc[1]['strikes'][strk_idx]
-        chains_df = tradier.market.get_option_chains('SPY', expr_date)
-        assert chains_df is not None
-        option_symbol = chains_df[
-            (chains_df['strike'] == strike) & (chains_df['option_type'] == 'call')
-        ].iloc[0]['symbol']
+        strk_idx = int(len(df_expr['strikes'].iat[0]) / 2)
+        strike = df_expr['strikes'].iat[1][strk_idx]
+        chains_df = spy_chains
+        option_symbol = tradier.market.get_option_symbol('SPY', df_expr.index[1], strike, 'call', chains=chains_df)
 
         # Place the order
         option_order = tradier.orders.order_option(asset_symbol="SPY", option_symbol=option_symbol, quantity=1,
                                                    side='buy_to_open', order_type='market', tag='unittest')
         assert isinstance(option_order, dict)
-        assert 'id' in option_order.keys()
-        assert 'status' in option_order.keys()
+        assert 'id' in option_order
+        assert 'status' in option_order
         assert option_order['id'] > 0
 
         # Cancel the testing order once we are done
@@ -89,42 +210,18 @@ class TestOrders:
         assert resp
         assert resp['id'] == option_order['id']
 
-    def test_option_order_multileg(self, tradier):
-        from lumiwealth_tradier.orders import OrderLeg
-
-        # Lookup Expiration Date, Strike, and Option Symbol
-        df_expr = tradier.market.get_option_expirations('SPY')
-        assert df_expr is not None
-        expr_date = df_expr.index[1]
-
-        # Pick a strike from the middle of the list
-        strk_idx = int(len(df_expr.iloc[1]['strikes']) / 2)
-        strike = df_expr.iloc[1]['strikes'][strk_idx]
-        chains_df = tradier.market.get_option_chains('SPY', expr_date)
-        assert chains_df is not None
-
-        option_symbol_1 = chains_df[
-            (chains_df['strike'] == strike) & (chains_df['option_type'] == 'call')
-        ].iloc[0]['symbol']
-
-        option_symbol_2 = chains_df[
-            (chains_df['strike'] == strike) & (chains_df['option_type'] == 'put')
-        ].iloc[0]['symbol']
-
-        # Create multileg order legs
-        leg1 = OrderLeg(option_symbol=option_symbol_1, quantity=1, side='buy_to_open')
-        leg2 = OrderLeg(option_symbol=option_symbol_2, quantity=1, side='buy_to_open')
-
-        # Example assuming order_type and duration are required and correctly set
+    @pytest.mark.live
+    @pytest.mark.parametrize('order_type,price', [('market', None), ('credit', 0.01)])
+    def test_option_order_multileg(self, tradier, spy_straddle_legs, order_type, price):
         multileg_order = tradier.orders.multileg_order(
             symbol='SPY',
-            order_type='market',  # or 'debit', 'credit', 'even', based on your requirement
+            order_type=order_type,
             duration='day',  # or 'gtc', 'pre', 'post'
-            legs=[leg1, leg2],
-            price=None,  # Assuming market order for the example
+            legs=list(spy_straddle_legs),
+            price=price,  # Limit price, not needed for market orders
             tag='unittest'
         )
-        
+
         # Check that status is ok
         assert multileg_order['status'] == 'ok'
 
@@ -139,63 +236,13 @@ class TestOrders:
         assert resp
         assert resp['id'] == multileg_order['id']
 
-    # Test options order multileg with credit price
-    def test_option_order_multileg_credit(self, tradier):
-        from lumiwealth_tradier.orders import OrderLeg
-
-        # Lookup Expiration Date, Strike, and Option Symbol
-        df_expr = tradier.market.get_option_expirations('SPY')
-        assert df_expr is not None
-        expr_date = df_expr.index[1]
-
-        # Pick a strike from the middle of the list
-        strk_idx = int(len(df_expr.iloc[1]['strikes']) / 2)
-        strike = df_expr.iloc[1]['strikes'][strk_idx]
-        chains_df = tradier.market.get_option_chains('SPY', expr_date)
-        assert chains_df is not None
-
-        option_symbol_1 = chains_df[
-            (chains_df['strike'] == strike) & (chains_df['option_type'] == 'call')
-        ].iloc[0]['symbol']
-
-        option_symbol_2 = chains_df[
-            (chains_df['strike'] == strike) & (chains_df['option_type'] == 'put')
-        ].iloc[0]['symbol']
-
-        # Create multileg order legs
-        leg1 = OrderLeg(option_symbol=option_symbol_1, quantity=1, side='buy_to_open')
-        leg2 = OrderLeg(option_symbol=option_symbol_2, quantity=1, side='buy_to_open')
-
-        # Example assuming order_type and duration are required and correctly set
-        multileg_order = tradier.orders.multileg_order(
-            symbol='SPY',
-            order_type="credit",
-            duration='day',  # or 'gtc', 'pre', 'post'
-            legs=[leg1, leg2],
-            price=0.01,  # Limit price
-            tag='unittest'
-        )
-        
-        # Check that status is ok
-        assert multileg_order['status'] == 'ok'
-
-        # Check it returned id
-        assert 'id' in multileg_order.keys()
-
-        # Check it returned a partner_id
-        assert 'partner_id' in multileg_order.keys()
-
-        # Cancel the testing order once we are done
-        resp = tradier.orders.cancel(multileg_order['id'])
-        assert resp
-        assert resp['id'] == multileg_order['id']
-
+    @pytest.mark.live
     def test_buying_brk_stock(self, tradier):
         # Submit basic order
         basic_order = tradier.orders.order(symbol='BRK.B', quantity=1, side='buy', order_type='market', tag='unittest')
         assert isinstance(basic_order, dict)
-        assert 'id' in basic_order.keys()
-        assert 'status' in basic_order.keys()
+        assert 'id' in basic_order
+        assert 'status' in basic_order
         assert basic_order['id'] > 0
 
         # Retrieve order status
@@ -208,26 +255,25 @@ class TestOrders:
         assert resp
         assert resp['id'] == basic_order['id']
 
+    @pytest.mark.live
     def test_buying_spx_index_option(self, tradier):
         # Lookup Expiration Date, Strike, and Option Symbol
         df_expr = tradier.market.get_option_expirations('SPX')
         assert df_expr is not None
         expr_date = df_expr.index[1]
         # Pick a strike from the middle of the list
-        strk_idx = int(len(df_expr.iloc[0]['strikes']) / 2)
-        strike = df_expr.iloc[0]['strikes'][strk_idx]
+        strk_idx = int(len(df_expr['strikes'].iat[0]) / 2)
+        strike = df_expr['strikes'].iat[0][strk_idx]
         chains_df = tradier.market.get_option_chains('SPX', expr_date)
         assert chains_df is not None
-        option_symbol = chains_df[
-            (chains_df['strike'] == strike) & (chains_df['option_type'] == 'call')
-        ].iloc[0]['symbol']
+        option_symbol = tradier.market.get_option_symbol('SPX', expr_date, strike, 'call', chains=chains_df)
 
         # Place the order
         option_order = tradier.orders.order_option(asset_symbol="SPX", option_symbol=option_symbol, quantity=1,
                                                    side='buy_to_open', order_type='market', tag='unittest')
         assert isinstance(option_order, dict)
-        assert 'id' in option_order.keys()
-        assert 'status' in option_order.keys()
+        assert 'id' in option_order
+        assert 'status' in option_order
         assert option_order['id'] > 0
 
         # Cancel the testing order once we are done
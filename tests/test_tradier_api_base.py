@@ -1,9 +1,12 @@
+import io
+import json
 import os
 import time
+import pytest
 import requests
 
 
-from lumiwealth_tradier.base import TradierApiBase
+from lumiwealth_tradier.base import DEFAULT_RETRY_ATTEMPTS, DEFAULT_TIMEOUT, TradierApiBase, TradierApiError, _to_df
 
 
 class TestTradierApiBase:
@@ -44,4 +47,134 @@ class TestTradierApiBase:
         finally:
             t1 = time.time()
             actual = t1 - t0
-            assert t1 - t0 > 5
\ No newline at end of file
+            assert t1 - t0 > 5
+
+    def test_request_cache_ttl(self, mocker):
+        response = mocker.Mock(status_code=200, content=b'{"profile": {"id": "abc"}}')
+        response.json.return_value = {"profile": {"id": "abc"}}
+        get = mocker.patch.object(self.tradier_api_base._session, 'get', return_value=response)
+
+        first = self.tradier_api_base.request('v1/user/profile', cache_ttl=60)
+        second = self.tradier_api_base.request('v1/user/profile', cache_ttl=60)
+        assert first == {"profile": {"id": "abc"}}
+        assert second is first
+        assert get.call_count == 1
+
+        # Requests without a TTL always go to the API
+        self.tradier_api_base.request('v1/user/profile')
+        assert get.call_count == 2
+
+        self.tradier_api_base.clear_cache()
+        self.tradier_api_base.request('v1/user/profile', cache_ttl=60)
+        assert get.call_count == 3
+
+    def test_request_cache_skips_incomplete_responses(self, mocker):
+        mocker.patch('time.sleep')
+        response = mocker.Mock(status_code=200, content=b'{"profile": null}')
+        response.json.side_effect = lambda: json.loads(response.content)
+        get = mocker.patch.object(self.tradier_api_base._session, 'get', return_value=response)
+
+        # Every retry came back without a profile, so the next call asks the API again
+        self.tradier_api_base.request('v1/user/profile', required_response_key='profile', cache_ttl=60)
+        assert get.call_count == DEFAULT_RETRY_ATTEMPTS
+        self.tradier_api_base.request('v1/user/profile', required_response_key='profile', cache_ttl=60)
+        assert get.call_count == 2 * DEFAULT_RETRY_ATTEMPTS
+
+        response.content = b'{"profile": {"id": "abc"}}'
+        self.tradier_api_base.request('v1/user/profile', required_response_key='profile', cache_ttl=60)
+        self.tradier_api_base.request('v1/user/profile', required_response_key='profile', cache_ttl=60)
+        assert get.call_count == 2 * DEFAULT_RETRY_ATTEMPTS + 1
+
+    def test_requests_retry_session_default_is_idempotent_no_mount_calls(self, mocker):
+        mount = mocker.patch.object(self.tradier_api_base._session, 'mount')
+        session = self.tradier_api_base.requests_retry_session()
+        assert session is self.tradier_api_base._session
+        assert self.tradier_api_base.requests_retry_session() is session
+        mount.assert_not_called()
+
+    def test_requests_retry_session_custom_retries_uses_new_session(self):
+        session = self.tradier_api_base.requests_retry_session(retries=2)
+        assert session is not self.tradier_api_base._session
+        assert session.get_adapter('https://api.tradier.com').max_retries.total == 2
+
+    def test_tradier_clients_share_one_session(self):
+        from lumiwealth_tradier import Tradier
+
+        tradier = Tradier('123', 'token', is_paper=True)
+        assert tradier.account._session is tradier._session
+        assert tradier.orders._session is tradier._session
+        assert tradier.market._session is tradier._session
+        assert tradier._session.get_adapter('https://sandbox.tradier.com').max_retries.total == 3
+
+    def test_shared_session_keeps_each_clients_token(self, mocker):
+        session = requests.Session()
+        paper = TradierApiBase('123', 'paper-token', is_paper=True, session=session)
+        live = TradierApiBase('456', 'live-token', is_paper=False, session=session)
+        assert 'Authorization' not in session.headers
+
+        response = mocker.Mock(status_code=200, content=b'{"clock": {}}')
+        send = mocker.patch.object(session, 'send', return_value=response)
+        paper.request('v1/markets/clock')
+        assert send.call_args.args[0].headers['Authorization'] == 'Bearer paper-token'
+        live.send('v1/accounts/456/orders', {'symbol': 'SPY'})
+        assert send.call_args.args[0].headers['Authorization'] == 'Bearer live-token'
+        paper.request('v1/markets/clock', headers={'Accept': 'application/xml'})
+        assert send.call_args.args[0].headers['Authorization'] == 'Bearer paper-token'
+        assert send.call_args.args[0].headers['Accept'] == 'application/xml'
+
+    def test_default_sessions_share_one_adapter(self):
+        other = TradierApiBase('123', 'token', is_paper=True)
+        adapter = self.tradier_api_base._session.get_adapter('https://api.tradier.com')
+        assert other._session is not self.tradier_api_base._session
+        assert other._session.get_adapter('https://api.tradier.com') is adapter
+
+    def test_request_timeouts(self, mocker):
+        response = mocker.Mock(status_code=200, content=b'{"order": {"id": 1}}')
+        response.json.return_value = {"order": {"id": 1}}
+        post = mocker.patch.object(self.tradier_api_base._session, 'post', return_value=response)
+        self.tradier_api_base.send('v1/accounts/123/orders', {'symbol': 'SPY'})
+        assert post.call_args.kwargs['timeout'] == DEFAULT_TIMEOUT
+
+        self.tradier_api_base.send('v1/accounts/123/orders', {'symbol': 'SPY'}, timeout=30)
+        assert post.call_args.kwargs['timeout'] == 30
+
+    def test_stream_items_matches_request(self, mocker):
+        def stream(status_code, body):
+            response = mocker.MagicMock(status_code=status_code, raw=io.BytesIO(body), text=body.decode())
+            response.__enter__.return_value = response
+            mocker.patch.object(self.tradier_api_base._session, 'get', return_value=response)
+            return list(self.tradier_api_base._stream_items('v1/accounts/123/history', 'history.event'))
+
+        events = stream(200, b'{"history": {"event": [{"amount": 1.0}, {"amount": 2.0}]}}')
+        assert events == [{'amount': 1.0}, {'amount': 2.0}]
+        assert stream(200, b'{"history": {"event": {"amount": 1.0}}}') == [{'amount': 1.0}]
+
+        # Error payloads raise, and 502 error pages or empty bodies have no items, just like with request()
+        with pytest.raises(TradierApiError, match='Invalid limit'):
+            stream(200, b'{"errors": {"error": "Invalid limit"}}')
+        assert stream(502, b'<html>Bad Gateway</html>') == []
+        assert stream(200, b'') == []
+        with pytest.raises(TradierApiError):
+            stream(401, b'Invalid Access Token')
+
+    def test_request_empty_body_skips_json_parsing(self, mocker):
+        response = mocker.Mock(status_code=502, content=b'<html>Bad Gateway</html>')
+        mocker.patch.object(self.tradier_api_base._session, 'get', return_value=response)
+        assert self.tradier_api_base.request('v1/markets/clock') == {}
+        response.json.assert_not_called()
+
+    def test_request_raises_api_errors(self, mocker):
+        response = mocker.Mock(status_code=200, content=b'{"errors": {"error": ["Bad symbol", "Bad date"]}}')
+        response.json.return_value = {"errors": {"error": ["Bad symbol", "Bad date"]}}
+        mocker.patch.object(self.tradier_api_base._session, 'get', return_value=response)
+        with pytest.raises(TradierApiError, match=r"Bad symbol \| Bad date"):
+            self.tradier_api_base.request('v1/markets/quotes')
+
+    def test_to_df_wraps_single_records(self):
+        single = _to_df({'symbol': 'SPY', 'greeks': {'delta': 0.5}}, nested=True)
+        assert list(single.columns) == ['symbol', 'greeks.delta']
+        assert len(single) == 1
+
+        many = _to_df([{'symbol': 'SPY'}, {'symbol': 'QQQ'}])
+        assert list(many['symbol']) == ['SPY', 'QQQ']
+        assert len(_to_df(iter([{'symbol': 'SPY'}]))) == 1